@@ -0,0 +1,213 @@
+import os, sys, zlib, shutil, sqlite3, datetime
+from auth import DB_PATH, conn
+
+# ------------------- Cold Archive -------------------
+# Notes and doubts (with their answers) older than a cutoff move to a
+# separate archive database with zlib-compressed text, and attachments move
+# to ARCHIVE_UPLOADS.
+# A note's edit history moves with it; rows that only describe the hot copy
+# (tags, stats, checksums of the moved files) are deleted, and the full-text
+# index drops the rows through its delete triggers (unified.py).
+# The hot database keeps only recent rows. Search attaches the archive
+# read-only when asked to include it.
+#
+#   python archive.py 365            # archive everything older than a year
+#   python archive.py 365 --vacuum   # and shrink the hot file afterwards
+
+ARCHIVE_PATH = "campus_connect_archive.db"
+ARCHIVE_UPLOADS = "archive_uploads"
+
+def inflate(blob):
+    if blob is None:
+        return None
+    return zlib.decompress(blob).decode("utf-8")
+
+def deflate(text):
+    if text is None:
+        return None
+    return zlib.compress(text.encode("utf-8"), 9)
+
+conn.create_function("inflate", 1, inflate, deterministic=True)
+
+def _create_archive_schema(db, schema="main"):
+    db.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.notes (
+                    id INTEGER PRIMARY KEY,
+                    user_id INTEGER,
+                    subject TEXT,
+                    topic TEXT,
+                    content_z BLOB,
+                    timestamp TEXT,
+                    file_path TEXT,
+                    tags TEXT
+                )''')
+    db.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.doubts (
+                    id INTEGER PRIMARY KEY,
+                    user_id INTEGER,
+                    username TEXT,
+                    subject TEXT,
+                    question_z BLOB,
+                    timestamp TEXT
+                )''')
+    db.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.answers (
+                    id INTEGER PRIMARY KEY,
+                    doubt_id INTEGER,
+                    user_id INTEGER,
+                    username TEXT,
+                    answer_z BLOB,
+                    timestamp TEXT
+                )''')
+    db.execute(f'''CREATE TABLE IF NOT EXISTS {schema}.note_revisions (
+                    note_id INTEGER,
+                    version INTEGER,
+                    kind TEXT,
+                    subject TEXT,
+                    topic TEXT,
+                    data BLOB,
+                    edited_by INTEGER,
+                    edited_at TEXT,
+                    PRIMARY KEY (note_id, version)
+                )''')
+    db.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_archive_notes_ts ON notes (timestamp)")
+
+def _copy_attachment(path, copied):
+    """
+    Copy an attachment into ARCHIVE_UPLOADS under a name no other file
+    has, recording original -> copy in `copied`. The original is removed
+    only after the rows pointing at the copy are committed.
+    """
+    if not path or not os.path.exists(path):
+        return path
+    if path in copied:
+        return copied[path]
+    os.makedirs(ARCHIVE_UPLOADS, exist_ok=True)
+    root, ext = os.path.splitext(os.path.basename(path))
+    dest, n = os.path.join(ARCHIVE_UPLOADS, root + ext), 1
+    while True:
+        try:
+            open(dest, "xb").close()
+            break
+        except FileExistsError:
+            dest = os.path.join(ARCHIVE_UPLOADS, f"{root}_{n}{ext}")
+            n += 1
+    copied[path] = dest
+    shutil.copy2(path, dest)
+    return dest
+
+def archive_older_than(days, batch_size=1000, vacuum=False):
+    """
+    Move notes/doubts older than `days` into the archive. Each batch is
+    copied and deleted in one transaction spanning both files, so a row is
+    never in both or neither. Attachments are copied before that
+    transaction and the originals deleted after it commits; if it fails
+    the copies are removed instead. Returns counts.
+    """
+    cutoff = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    db = sqlite3.connect(DB_PATH, timeout=30)
+    db.create_function("deflate", 1, deflate)
+    db.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_PATH,))
+    _create_archive_schema(db, "archive")
+    db.commit()
+    moved = {"notes": 0, "doubts": 0, "answers": 0, "files": 0}
+
+    while True:
+        rows = db.execute("SELECT id, user_id, subject, topic, content, timestamp, file_path FROM notes "
+                          "WHERE timestamp < ? ORDER BY id LIMIT ?", (cutoff, batch_size)).fetchall()
+        if not rows:
+            break
+        ids = [r[0] for r in rows]
+        marks = ",".join("?" * len(ids))
+        note_tags = {}
+        if _has_table(db, "note_tags"):
+            note_tags = dict(db.execute(f"""SELECT note_tags.note_id, group_concat(tags.name, ' ') FROM note_tags
+                                            JOIN tags ON tags.id = note_tags.tag_id
+                                            WHERE note_tags.note_id IN ({marks}) GROUP BY note_tags.note_id""", ids))
+        copied = {}
+        try:
+            archived = [(note_id, user_id, subject, topic, deflate(content), ts, _copy_attachment(path, copied),
+                         note_tags.get(note_id))
+                        for note_id, user_id, subject, topic, content, ts, path in rows]
+            # Further files of multi-file notes move too; their rows stay in
+            # attachments with the new location.
+            relinked = []
+            if _has_table(db, "attachments"):
+                for att_id, path in db.execute(f"SELECT id, file_path FROM attachments WHERE note_id IN ({marks})", ids).fetchall():
+                    relinked.append((_copy_attachment(path, copied), att_id))
+            with db:
+                db.executemany("INSERT OR REPLACE INTO archive.notes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", archived)
+                db.execute(f"DELETE FROM notes WHERE id IN ({marks})", ids)
+                if relinked:
+                    db.executemany("UPDATE attachments SET file_path=? WHERE id=?", relinked)
+                if _has_table(db, "note_revisions"):
+                    db.execute(f"""INSERT OR REPLACE INTO archive.note_revisions
+                                   SELECT note_id, version, kind, subject, topic, data, edited_by, edited_at
+                                   FROM note_revisions WHERE note_id IN ({marks})""", ids)
+                for table in ("note_tags", "note_stats", "note_revisions"):
+                    if _has_table(db, table):
+                        db.execute(f"DELETE FROM {table} WHERE note_id IN ({marks})", ids)
+                if _has_table(db, "file_checksums"):
+                    db.executemany("DELETE FROM file_checksums WHERE file_path=?", [(p,) for p in copied])
+        except BaseException:
+            # Nothing points at the copies; the originals are untouched.
+            for dest in copied.values():
+                if os.path.exists(dest):
+                    os.remove(dest)
+            raise
+        for original in copied:
+            try:
+                os.remove(original)
+            except OSError:
+                pass   # left for the orphan sweep in maintenance.py
+        moved["files"] += len(copied)
+        moved["notes"] += len(rows)
+
+    with db:
+        db.execute("""INSERT OR REPLACE INTO archive.doubts
+                      SELECT doubts.id, doubts.user_id, users.username, doubts.subject, deflate(doubts.question), doubts.timestamp
+                      FROM doubts LEFT JOIN users ON users.id = doubts.user_id WHERE doubts.timestamp < ?""", (cutoff,))
+        moved["doubts"] = db.execute("DELETE FROM doubts WHERE timestamp < ?", (cutoff,)).rowcount
+        # Answers follow their doubt, including any left behind by earlier runs.
+        db.execute("""INSERT OR REPLACE INTO archive.answers
+                      SELECT answers.id, answers.doubt_id, answers.user_id, users.username, deflate(answers.answer), answers.timestamp
+                      FROM answers LEFT JOIN users ON users.id = answers.user_id
+                      WHERE answers.doubt_id NOT IN (SELECT id FROM doubts)""")
+        moved["answers"] = db.execute("DELETE FROM answers WHERE doubt_id NOT IN (SELECT id FROM doubts)").rowcount
+
+    db.execute("DETACH DATABASE archive")
+    if vacuum:
+        db.execute("VACUUM")
+    db.close()
+    return moved
+
+def _has_table(db, name):
+    return db.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+# ------------------- Read Access -------------------
+def attach_archive(cursor):
+    """
+    ATTACH the archive read-only to the given connection's cursor, once.
+    Returns False if there is no archive yet.
+    """
+    if not os.path.exists(ARCHIVE_PATH):
+        return False
+    attached = {row[1] for row in cursor.execute("PRAGMA database_list")}
+    if "archive" not in attached:
+        uri = "file:" + os.path.abspath(ARCHIVE_PATH).replace("\\", "/") + "?mode=ro"
+        cursor.execute("ATTACH DATABASE ? AS archive", (uri,))
+    return True
+
+ARCHIVE_NOTES_SELECT = """
+    SELECT id, subject, topic, inflate(content_z), timestamp, file_path, tags
+    FROM archive.notes
+    WHERE (topic LIKE ? OR subject LIKE ? OR inflate(content_z) LIKE ? OR file_path LIKE ?)
+"""
+
+ARCHIVE_DOUBTS_SELECT = """
+    SELECT id, username, subject, inflate(question_z), timestamp FROM archive.doubts
+"""
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2:
+        print(archive_older_than(int(sys.argv[1]), vacuum="--vacuum" in sys.argv))
+    else:
+        print("usage: python archive.py DAYS [--vacuum]")
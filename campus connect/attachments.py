@@ -0,0 +1,38 @@
+from auth import KIOSK, conn, c
+
+# ------------------- Attachments -------------------
+# A note can own several files. attachments lists every file of a note in
+# upload order; notes.file_path keeps the first one for readers that show a
+# single file. Search results and the HTTP server list every attachment.
+
+c.execute('''CREATE TABLE IF NOT EXISTS attachments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                note_id INTEGER,
+                position INTEGER,
+                file_path TEXT,
+                size INTEGER,
+                sha256 TEXT
+            )''')
+c.execute("CREATE INDEX IF NOT EXISTS idx_attachments_note ON attachments (note_id, position)")
+c.execute("CREATE INDEX IF NOT EXISTS idx_attachments_path ON attachments (file_path)")
+if not KIOSK and c.execute("SELECT 1 FROM attachments LIMIT 1").fetchone() is None:
+    # First run: every existing single attachment becomes position 0.
+    c.execute("""INSERT INTO attachments (note_id, position, file_path)
+                 SELECT id, 0, file_path FROM notes WHERE file_path IS NOT NULL AND file_path != ''""")
+conn.commit()
+
+INSERT_SQL = "INSERT INTO attachments (note_id, position, file_path, size, sha256) VALUES (?, ?, ?, ?, ?)"
+
+def attachments_for(note_ids, db=None):
+    """
+    Map note id -> [file_path, ...] in upload order.
+    """
+    if not note_ids:
+        return {}
+    db = db or c
+    marks = ",".join("?" * len(note_ids))
+    out = {}
+    for note_id, path in db.execute(f"SELECT note_id, file_path FROM attachments WHERE note_id IN ({marks}) "
+                                   "ORDER BY note_id, position", list(note_ids)):
+        out.setdefault(note_id, []).append(path)
+    return out
@@ -6,7 +6,38 @@ import os
 os.makedirs("uploads", exist_ok=True)
 
 # Connect to database
-conn = sqlite3.connect("campus_connect.db")
+DB_PATH = "campus_connect.db"
+
+# Kiosk mode (CAMPUS_KIOSK=1): browse/search only. The database file is
+# opened read-only just long enough to copy it into a shared in-memory
+# snapshot; everything else reads the snapshot. See kiosk.py.
+KIOSK = os.environ.get("CAMPUS_KIOSK") == "1"
+SNAPSHOT_URI = "file:campus_connect_kiosk?mode=memory&cache=shared"
+
+def connect(**kwargs):
+    """
+    New read connection: the database file, or the snapshot in kiosk mode.
+    """
+    if KIOSK:
+        return sqlite3.connect(SNAPSHOT_URI, uri=True, **kwargs)
+    return sqlite3.connect(DB_PATH, **kwargs)
+
+def copy_snapshot(target):
+    """
+    Copy the database file into `target` with the backup API, reading
+    through a read-only handle.
+    """
+    src = sqlite3.connect("file:" + os.path.abspath(DB_PATH).replace("\\", "/") + "?mode=ro", uri=True, timeout=30)
+    try:
+        src.backup(target)
+    finally:
+        src.close()
+
+if KIOSK:
+    conn = sqlite3.connect(SNAPSHOT_URI, uri=True)
+    copy_snapshot(conn)
+else:
+    conn = sqlite3.connect(DB_PATH, uri=True)  # uri=True lets archive.py ATTACH read-only
 c = conn.cursor()
 
 # Create tables
@@ -23,8 +54,42 @@ c.execute('''CREATE TABLE IF NOT EXISTS notes (
                 topic TEXT,
                 content TEXT,
                 timestamp TEXT,
-                file_path TEXT
+                file_path TEXT,
+                created_at INTEGER
+            )''')
+
+# notes.created_at: integer epoch seconds next to the display `timestamp`,
+# so date filters and sorting use compact, indexable values.
+if "created_at" not in [row[1] for row in c.execute("PRAGMA table_info(notes)")]:
+    c.execute("ALTER TABLE notes ADD COLUMN created_at INTEGER")
+    c.execute("UPDATE notes SET created_at = CAST(strftime('%s', timestamp, 'utc') AS INTEGER)")
+# Writers that only set `timestamp` (legacy scripts, dbsync, shards) still get one.
+c.execute('''CREATE TRIGGER IF NOT EXISTS notes_fill_created_at AFTER INSERT ON notes
+             WHEN NEW.created_at IS NULL
+             BEGIN
+                 UPDATE notes SET created_at = CAST(strftime('%s', NEW.timestamp, 'utc') AS INTEGER) WHERE id = NEW.id;
+             END''')
+c.execute("CREATE INDEX IF NOT EXISTS idx_notes_created ON notes (created_at)")
+# Subject filters use idx_notes_subject_id_created (subjects.py) now.
+c.execute("DROP INDEX IF EXISTS idx_notes_subject_created")
+c.execute("CREATE INDEX IF NOT EXISTS idx_notes_user_created ON notes (user_id, created_at)")
+
+c.execute('''CREATE TABLE IF NOT EXISTS doubts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                subject TEXT,
+                question TEXT,
+                timestamp TEXT
+            )''')
+
+c.execute('''CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                doubt_id INTEGER,
+                user_id INTEGER,
+                answer TEXT,
+                timestamp TEXT
             )''')
+c.execute("CREATE INDEX IF NOT EXISTS idx_answers_doubt ON answers (doubt_id)")
 conn.commit()
 
 # Hash password
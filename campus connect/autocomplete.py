@@ -0,0 +1,120 @@
+import threading
+from auth import conn, c, connect
+from writer import get_writer
+import tags  # creates tags / note_tags
+
+# ------------------- Autocomplete -------------------
+# Suggestions for the search box come from a prefix trie over distinct
+# subjects, topics, tags and past search queries, weighted by how often each
+# appears. Every trie node caches its TOP_K best completions, so a lookup is
+# one walk down the prefix with no scan of the subtree. Weights only grow,
+# which keeps those cached lists correct under incremental updates.
+
+TOP_K = 8
+MAX_TERM_LENGTH = 60
+
+c.execute('''CREATE TABLE IF NOT EXISTS search_queries (
+                query TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            )''')
+conn.commit()
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []   # [(weight, term)], heaviest first, at most TOP_K
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self.root = None
+        self.weights = {}   # lowercased term -> weight
+        self.display = {}   # lowercased term -> form shown to the user
+        self.lock = threading.Lock()
+
+    def _ensure_built(self):
+        if self.root is not None:
+            return
+        self.root = _Node()
+        # warm() builds on its own thread, so read through a private connection.
+        db = connect(timeout=30)
+        for sql in ("SELECT subject, COUNT(*) FROM notes WHERE subject IS NOT NULL GROUP BY subject COLLATE NOCASE",
+                    "SELECT topic, COUNT(*) FROM notes WHERE topic IS NOT NULL GROUP BY topic COLLATE NOCASE",
+                    "SELECT tags.name, COUNT(*) FROM note_tags JOIN tags ON tags.id = note_tags.tag_id GROUP BY tags.name",
+                    "SELECT query, count FROM search_queries"):
+            for term, weight in db.execute(sql).fetchall():
+                self._add(term, weight)
+        db.close()
+
+    def _add(self, term, weight):
+        term = " ".join((term or "").split())[:MAX_TERM_LENGTH]
+        key = term.lower()
+        if not key:
+            return
+        self.display.setdefault(key, term)
+        total = self.weights.get(key, 0) + weight
+        self.weights[key] = total
+        for path_node in self._path(key):
+            if len(path_node.top) == TOP_K and total <= path_node.top[-1][0]:
+                continue   # cannot enter this node's list, and was not in it either
+            top = [entry for entry in path_node.top if entry[1] != key]
+            top.append((total, key))
+            top.sort(reverse=True)
+            path_node.top = top[:TOP_K]
+
+    def _path(self, key):
+        node = self.root
+        yield node
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+            yield node
+
+    def invalidate(self):
+        with self.lock:
+            self.root = None
+            self.weights = {}
+            self.display = {}
+
+    def warm(self):
+        """
+        Build the trie on a background thread so the first keystroke is fast.
+        """
+        threading.Thread(target=self.suggest, args=("",), name="campus-autocomplete", daemon=True).start()
+
+    def add(self, *terms, weight=1):
+        with self.lock:
+            if self.root is None:
+                return   # picked up from the tables when the trie is built
+            for term in terms:
+                self._add(term, weight)
+
+    def suggest(self, prefix, k=TOP_K):
+        """
+        Up to k completions for prefix, most frequent first.
+        """
+        key = " ".join((prefix or "").split()).lower()
+        with self.lock:
+            self._ensure_built()
+            node = self.root
+            for ch in key:
+                node = node.children.get(ch)
+                if node is None:
+                    return []
+            return [self.display[term] for _, term in node.top[:k]]
+
+
+index = SuggestionIndex()
+
+def record_query(query):
+    """
+    Count a search the user ran, so common queries are suggested too.
+    """
+    query = " ".join((query or "").split())[:MAX_TERM_LENGTH]
+    if len(query) < 2:
+        return
+    get_writer().submit("""INSERT INTO search_queries (query, count) VALUES (?, 1)
+                           ON CONFLICT(query) DO UPDATE SET count = count + 1""", (query.lower(),))
+    index.add(query)
@@ -0,0 +1,106 @@
+import os, time, sqlite3
+from auth import DB_PATH, conn, c
+
+# ------------------- Change Feed -------------------
+# Every insert/update/delete on notes, doubts and answers appends a row to
+# `changes` via triggers, so writes from any path (write queue, other
+# processes) are captured. seq is monotonically increasing and serves as the
+# client cursor. Rows older than KEEP_DAYS are pruned by the maintenance
+# daemon; a client whose cursor is below oldest_seq() has missed changes and
+# must reload.
+
+KEEP_DAYS = float(os.environ.get("CAMPUS_CHANGES_KEEP_DAYS", "30"))
+
+c.execute('''CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity TEXT,
+                entity_id INTEGER,
+                op TEXT,
+                changed_at TEXT DEFAULT (datetime('now', 'localtime'))
+            )''')
+for _table, _entity in (("notes", "note"), ("doubts", "doubt"), ("answers", "answer")):
+    for _event, _op, _ref in (("INSERT", "insert", "NEW"), ("UPDATE", "update", "NEW"), ("DELETE", "delete", "OLD")):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {_table}_{_op}_feed AFTER {_event} ON {_table}
+                      BEGIN
+                          INSERT INTO changes (entity, entity_id, op) VALUES ('{_entity}', {_ref}.id, '{_op}');
+                      END''')
+conn.commit()
+
+NOTE_COLUMNS = "id, user_id, subject, topic, content, timestamp, file_path"
+DOUBT_COLUMNS = "doubts.id, users.username, doubts.subject, doubts.question, doubts.timestamp"
+ANSWER_COLUMNS = "answers.id, answers.doubt_id, users.username, answers.answer, answers.timestamp"
+
+def latest_seq(db=None):
+    db = db or c
+    return db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+def oldest_seq(db=None):
+    db = db or c
+    return db.execute("SELECT COALESCE(MIN(seq), 0) FROM changes").fetchone()[0]
+
+def changes_since(cursor, entity=None, limit=500, db=None):
+    """
+    Return (changes, next_cursor). Each change is a dict with seq, entity,
+    id, op and, unless the row was deleted, the row's current values.
+    Several changes to the same row within the page collapse into the last.
+    entity is one of "note", "doubt", "answer" or a list of them.
+    """
+    db = db or c
+    sql = "SELECT seq, entity, entity_id, op FROM changes WHERE seq > ?"
+    params = [cursor]
+    if entity:
+        entities = [entity] if isinstance(entity, str) else list(entity)
+        sql += f" AND entity IN ({','.join('?' * len(entities))})"
+        params += entities
+    rows = db.execute(sql + " ORDER BY seq LIMIT ?", params + [limit]).fetchall()
+    if not rows:
+        return [], cursor
+
+    latest = {}
+    for seq, ent, entity_id, op in rows:
+        latest[(ent, entity_id)] = (seq, op)
+    result = []
+    for (ent, entity_id), (seq, op) in sorted(latest.items(), key=lambda kv: kv[1][0]):
+        change = {"seq": seq, "entity": ent, "id": entity_id, "op": op, "row": None}
+        if op != "delete":
+            if ent == "note":
+                change["row"] = db.execute(f"SELECT {NOTE_COLUMNS} FROM notes WHERE id=?", (entity_id,)).fetchone()
+            elif ent == "answer":
+                change["row"] = db.execute(f"SELECT {ANSWER_COLUMNS} FROM answers LEFT JOIN users ON answers.user_id = users.id "
+                                           "WHERE answers.id=?", (entity_id,)).fetchone()
+            else:
+                change["row"] = db.execute(f"SELECT {DOUBT_COLUMNS} FROM doubts LEFT JOIN users ON doubts.user_id = users.id "
+                                           "WHERE doubts.id=?", (entity_id,)).fetchone()
+        result.append(change)
+    return result, rows[-1][0]
+
+def prune(keep_days=KEEP_DAYS, db=None):
+    """
+    Delete change rows older than keep_days, always keeping the newest so
+    the cursor never goes backwards. Returns the number deleted.
+    """
+    own = db is None
+    db = db or sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        with db:
+            return db.execute("DELETE FROM changes WHERE changed_at < datetime('now', 'localtime', ?) "
+                              "AND seq < (SELECT MAX(seq) FROM changes)", (f"-{keep_days} days",)).rowcount
+    finally:
+        if own:
+            db.close()
+
+def wait_for_changes(cursor, entity=None, timeout=30.0, poll_interval=0.25):
+    """
+    Long-poll: block until something newer than cursor exists or the
+    timeout passes. Uses its own connection so it can run on any thread.
+    """
+    db = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            changes, next_cursor = changes_since(cursor, entity, db=db)
+            if changes or time.monotonic() >= deadline:
+                return changes, next_cursor
+            time.sleep(poll_interval)
+    finally:
+        db.close()
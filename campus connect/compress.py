@@ -0,0 +1,156 @@
+import os, sys, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ------------------- Ingest Recompression -------------------
+# Optional stage between stage_files and the INSERT: large images are
+# downscaled and re-encoded, PDFs are recompressed/linearized. Needs Pillow
+# for images and pikepdf for PDFs; without them files pass through as-is.
+# Enable with CAMPUS_COMPRESS=1.
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+ENABLED = os.environ.get("CAMPUS_COMPRESS", "0") == "1"
+MAX_DIMENSION = int(os.environ.get("CAMPUS_COMPRESS_MAX_DIM", "2000"))
+IMAGE_QUALITY = int(os.environ.get("CAMPUS_COMPRESS_QUALITY", "80"))
+IMAGE_FORMAT = os.environ.get("CAMPUS_COMPRESS_FORMAT", "WEBP").upper()
+# "keep" moves the original to ORIGINALS_DIR, "drop" deletes it.
+ORIGINALS_POLICY = os.environ.get("CAMPUS_COMPRESS_ORIGINALS", "drop")
+ORIGINALS_DIR = os.path.join("uploads", "originals")
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp"}
+
+_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="campus-compress")
+_lock = threading.Lock()
+totals = {"files": 0, "compressed": 0, "bytes_before": 0, "bytes_after": 0}
+
+def enabled():
+    return ENABLED and (Image is not None or pikepdf is not None)
+
+def _reserve(root, ext):
+    """
+    Claim root + ext (or root_<n> + ext) by creating it exclusively, so two
+    files of one upload ("a.png" and "a.jpg") never share an output name
+    and an existing upload is never overwritten.
+    """
+    dest, n = root + ext, 1
+    while True:
+        try:
+            open(dest, "xb").close()
+            return dest
+        except FileExistsError:
+            dest = f"{root}_{n}{ext}"
+            n += 1
+
+def _write_reserved(path, root, ext, save):
+    """
+    save(tmp) writes the output to a temp file beside path, which is then
+    renamed over a name reserved from root + ext. Nothing partial is left
+    on failure.
+    """
+    folder = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".part")
+    os.close(fd)
+    dest = None
+    try:
+        save(tmp)
+        dest = _reserve(root, ext)
+        os.replace(tmp, dest)
+        return dest
+    except Exception:
+        for leftover in (tmp, dest):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+
+def _compress_image(path):
+    ext = ".webp" if IMAGE_FORMAT == "WEBP" else ".jpg"
+
+    def save(tmp):
+        with Image.open(path) as img:
+            # Apply the EXIF orientation before the tag is dropped by re-encoding.
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((MAX_DIMENSION, MAX_DIMENSION))
+            if IMAGE_FORMAT == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img.save(tmp, IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    return _write_reserved(path, os.path.splitext(path)[0], ext, save)
+
+def _compress_pdf(path):
+    def save(tmp):
+        with pikepdf.open(path) as pdf:
+            pdf.save(tmp, linearize=True, compress_streams=True,
+                     object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    return _write_reserved(path, os.path.splitext(path)[0] + ".min", ".pdf", save)
+
+def compress_file(path):
+    """
+    Recompress one uploaded file. Returns (final_path, bytes_before,
+    bytes_after). The new file is only kept if it is smaller.
+    """
+    before = os.path.getsize(path)
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in IMAGE_EXTENSIONS and Image is not None:
+            dest = _compress_image(path)
+        elif ext == ".pdf" and pikepdf is not None:
+            dest = _compress_pdf(path)
+        else:
+            return path, before, before
+    except Exception:
+        # A file the codec cannot handle is stored untouched.
+        return path, before, before
+
+    after = os.path.getsize(dest)
+    if after >= before:
+        os.remove(dest)
+        return path, before, before
+    if ORIGINALS_POLICY == "keep":
+        os.makedirs(ORIGINALS_DIR, exist_ok=True)
+        root, ext = os.path.splitext(os.path.basename(path))
+        os.replace(path, _reserve(os.path.join(ORIGINALS_DIR, root), ext))
+    else:
+        os.remove(path)
+    return dest, before, after
+
+def _record(before, after):
+    with _lock:
+        totals["files"] += 1
+        totals["compressed"] += after < before
+        totals["bytes_before"] += before
+        totals["bytes_after"] += after
+
+def submit(path):
+    """
+    Queue a file on the worker pool. The Future resolves to the same tuple
+    as compress_file().
+    """
+    def job():
+        result = compress_file(path)
+        _record(result[1], result[2])
+        return result
+    return _pool.submit(job)
+
+def compress_many(paths):
+    """
+    Recompress several files in parallel and return the per-file results.
+    """
+    return [f.result() for f in [submit(p) for p in paths]]
+
+def stats():
+    with _lock:
+        saved = totals["bytes_before"] - totals["bytes_after"]
+        return dict(totals, bytes_saved=saved)
+
+
+if __name__ == "__main__":
+    # python compress.py file1.png file2.pdf ...
+    for path, before, after in compress_many(sys.argv[1:]):
+        print(f"{path}: {before} -> {after} bytes (saved {before - after})")
+    print(stats())
@@ -0,0 +1,252 @@
+import sys, uuid, sqlite3
+
+# ------------------- Database Delta Sync -------------------
+# Merges Campus Connect database files (the main app's, the legacy
+# Python/ scripts', lab copies) by exchanging only what changed.
+#
+# prepare() brings a file to the unified schema and installs triggers that
+# record every note/doubt change in sync_log. Each row gets a global identity
+# (origin database id, row id on that origin) in sync_rows, plus a version
+# timestamp. sync() pulls the peer's sync_log past the last seq seen from that
+# peer, so the cost is proportional to the number of changes.
+#
+# Conflicts: a version is "<UTC timestamp>:<origin of the writer>", so the
+# newer write wins and simultaneous writes are broken by the larger origin id.
+# Users are matched by username; if two databases disagree on a
+# password hash the larger hash wins. Both rules give the same result no
+# matter which side syncs first. Every user insert/update is logged too, so
+# accounts that never posted anything are carried over as well.
+#
+#   python dbsync.py prepare campus_connect.db
+#   python dbsync.py sync campus_connect.db "Python/campus_contact.db"
+
+SYNCED_TABLES = {
+    "notes": ["user_id", "subject", "topic", "content", "timestamp", "file_path"],
+    "doubts": ["user_id", "subject", "question", "timestamp"],
+}
+LEGACY_UPLOAD_DIR = "uploaded_notes"
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+def _columns(db, table):
+    return [row[1] for row in db.execute(f"PRAGMA table_info({table})")]
+
+def origin_id(db):
+    return db.execute("SELECT value FROM sync_meta WHERE key='origin'").fetchone()[0]
+
+def prepare(path):
+    """
+    Idempotently migrate a database file to the unified schema and enable
+    change tracking. Existing rows are logged once so the first sync can
+    carry them.
+    """
+    db = sqlite3.connect(path)
+    db.execute('''CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE,
+                    password TEXT
+                )''')
+    db.execute('''CREATE TABLE IF NOT EXISTS notes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    subject TEXT,
+                    topic TEXT,
+                    content TEXT,
+                    timestamp TEXT,
+                    file_path TEXT
+                )''')
+    db.execute('''CREATE TABLE IF NOT EXISTS doubts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    subject TEXT,
+                    question TEXT,
+                    timestamp TEXT
+                )''')
+
+    # Legacy layouts: pblpython.py stored only a `filename` under uploaded_notes/,
+    # pbl75.py had no file_path column at all.
+    cols = _columns(db, "notes")
+    if "content" not in cols:
+        db.execute("ALTER TABLE notes ADD COLUMN content TEXT")
+    if "file_path" not in cols:
+        db.execute("ALTER TABLE notes ADD COLUMN file_path TEXT")
+        if "filename" in cols:
+            db.execute("UPDATE notes SET file_path = ? || filename WHERE filename IS NOT NULL AND filename != ''",
+                       (LEGACY_UPLOAD_DIR + "/",))
+
+    db.execute("CREATE TABLE IF NOT EXISTS sync_meta (key TEXT PRIMARY KEY, value TEXT)")
+    db.execute('''CREATE TABLE IF NOT EXISTS sync_rows (
+                    tbl TEXT,
+                    local_id INTEGER,
+                    origin TEXT,
+                    origin_row_id INTEGER,
+                    version TEXT,
+                    deleted INTEGER DEFAULT 0,
+                    PRIMARY KEY (tbl, local_id)
+                )''')
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_rows_identity ON sync_rows (tbl, origin, origin_row_id)")
+    db.execute('''CREATE TABLE IF NOT EXISTS sync_log (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tbl TEXT,
+                    local_id INTEGER
+                )''')
+    db.execute("CREATE TABLE IF NOT EXISTS sync_state (peer TEXT PRIMARY KEY, last_seq INTEGER)")
+
+    fresh = db.execute("SELECT 1 FROM sync_meta WHERE key='origin'").fetchone() is None
+    if fresh:
+        db.execute("INSERT INTO sync_meta (key, value) VALUES ('origin', ?)", (uuid.uuid4().hex,))
+    origin = origin_id(db)
+    version = f"{NOW} || ':{origin}'"
+
+    # Users have no sync_rows identity: they are matched by username.
+    for event in ("INSERT", "UPDATE"):
+        db.execute(f'''CREATE TRIGGER IF NOT EXISTS sync_users_{event.lower()} AFTER {event} ON users
+                       BEGIN
+                           INSERT INTO sync_log (tbl, local_id) VALUES ('users', NEW.id);
+                       END''')
+    if db.execute("SELECT 1 FROM sync_meta WHERE key='users_logged'").fetchone() is None:
+        # Once per file, including files prepared before users were synced.
+        db.execute("INSERT INTO sync_log (tbl, local_id) SELECT 'users', id FROM users ORDER BY id")
+        db.execute("INSERT INTO sync_meta (key, value) VALUES ('users_logged', '1')")
+
+    for table in SYNCED_TABLES:
+        db.execute(f'''CREATE TRIGGER IF NOT EXISTS sync_{table}_insert AFTER INSERT ON {table}
+                       BEGIN
+                           INSERT OR IGNORE INTO sync_rows (tbl, local_id, origin, origin_row_id, version)
+                               VALUES ('{table}', NEW.id, '{origin}', NEW.id, {version});
+                           INSERT INTO sync_log (tbl, local_id) VALUES ('{table}', NEW.id);
+                       END''')
+        db.execute(f'''CREATE TRIGGER IF NOT EXISTS sync_{table}_update AFTER UPDATE ON {table}
+                       BEGIN
+                           UPDATE sync_rows SET version = {version} WHERE tbl = '{table}' AND local_id = NEW.id;
+                           INSERT INTO sync_log (tbl, local_id) VALUES ('{table}', NEW.id);
+                       END''')
+        db.execute(f'''CREATE TRIGGER IF NOT EXISTS sync_{table}_delete AFTER DELETE ON {table}
+                       BEGIN
+                           UPDATE sync_rows SET version = {version}, deleted = 1 WHERE tbl = '{table}' AND local_id = OLD.id;
+                           INSERT INTO sync_log (tbl, local_id) VALUES ('{table}', OLD.id);
+                       END''')
+        if fresh:
+            db.execute(f"""INSERT OR IGNORE INTO sync_rows (tbl, local_id, origin, origin_row_id, version)
+                           SELECT '{table}', id, ?, id, {version} FROM {table}""", (origin,))
+            db.execute(f"INSERT INTO sync_log (tbl, local_id) SELECT '{table}', id FROM {table} ORDER BY id")
+    db.commit()
+    return db
+
+# ------------------- Pull -------------------
+def _map_user(src, dst, src_user_id, cache):
+    """
+    Translate a user id from src to dst by username, creating the user in
+    dst if needed and settling password conflicts deterministically.
+    """
+    if src_user_id in cache:
+        return cache[src_user_id]
+    row = src.execute("SELECT username, password FROM users WHERE id=?", (src_user_id,)).fetchone()
+    if row is None:
+        cache[src_user_id] = None
+        return None
+    username, password = row
+    existing = dst.execute("SELECT id, password FROM users WHERE username=?", (username,)).fetchone()
+    if existing is None:
+        dst_id = dst.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password)).lastrowid
+    else:
+        dst_id = existing[0]
+        if (password or "") > (existing[1] or ""):
+            dst.execute("UPDATE users SET password=? WHERE id=?", (password, dst_id))
+    cache[src_user_id] = dst_id
+    return dst_id
+
+def pull(src, dst, batch_size=1000):
+    """
+    Apply every change src has logged since dst last pulled from it.
+    Returns counts of inserted/updated/deleted/skipped rows.
+    """
+    src_origin = origin_id(src)
+    row = dst.execute("SELECT last_seq FROM sync_state WHERE peer=?", (src_origin,)).fetchone()
+    last_seq = row[0] if row else 0
+    stats = {"inserted": 0, "updated": 0, "deleted": 0, "skipped": 0, "users": 0}
+    users = {}
+
+    while True:
+        entries = src.execute("SELECT seq, tbl, local_id FROM sync_log WHERE seq > ? ORDER BY seq LIMIT ?",
+                              (last_seq, batch_size)).fetchall()
+        if not entries:
+            break
+        # Only the latest state of each row matters.
+        touched = {}
+        for seq, tbl, local_id in entries:
+            touched[(tbl, local_id)] = seq
+        for (tbl, local_id), _ in sorted(touched.items(), key=lambda kv: kv[1]):
+            if tbl == "users":
+                # Creates the account by username or settles the password conflict.
+                users.pop(local_id, None)
+                stats["users"] += _map_user(src, dst, local_id, users) is not None
+            else:
+                _apply_row(src, dst, tbl, local_id, users, stats)
+        last_seq = entries[-1][0]
+        dst.execute("INSERT OR REPLACE INTO sync_state (peer, last_seq) VALUES (?, ?)", (src_origin, last_seq))
+        dst.commit()
+    return stats
+
+def _apply_row(src, dst, tbl, src_local_id, users, stats):
+    cols = SYNCED_TABLES[tbl]
+    ident = src.execute("SELECT origin, origin_row_id, version, deleted FROM sync_rows WHERE tbl=? AND local_id=?",
+                        (tbl, src_local_id)).fetchone()
+    if ident is None:
+        stats["skipped"] += 1
+        return
+    origin, origin_row_id, version, deleted = ident
+    mine = dst.execute("SELECT local_id, version, deleted FROM sync_rows WHERE tbl=? AND origin=? AND origin_row_id=?",
+                       (tbl, origin, origin_row_id)).fetchone()
+    if mine is not None and (mine[1] or "") >= (version or ""):
+        stats["skipped"] += 1
+        return
+
+    if deleted:
+        if mine is not None and not mine[2]:
+            dst.execute(f"DELETE FROM {tbl} WHERE id=?", (mine[0],))
+            stats["deleted"] += 1
+        local_id = mine[0] if mine else None
+    else:
+        values = src.execute(f"SELECT {', '.join(cols)} FROM {tbl} WHERE id=?", (src_local_id,)).fetchone()
+        if values is None:
+            stats["skipped"] += 1
+            return
+        values = list(values)
+        values[cols.index("user_id")] = _map_user(src, dst, values[cols.index("user_id")], users)
+        if mine is None or mine[2]:
+            local_id = dst.execute(f"INSERT INTO {tbl} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                                   values).lastrowid
+            if mine is not None:
+                dst.execute("DELETE FROM sync_rows WHERE tbl=? AND local_id=?", (tbl, mine[0]))
+            stats["inserted"] += 1
+        else:
+            local_id = mine[0]
+            dst.execute(f"UPDATE {tbl} SET {', '.join(c + '=?' for c in cols)} WHERE id=?", values + [local_id])
+            stats["updated"] += 1
+
+    if local_id is not None:
+        # The local triggers stamped this row as ours and "now"; restore the
+        # original identity and version so the change converges everywhere.
+        dst.execute("""INSERT OR REPLACE INTO sync_rows (tbl, local_id, origin, origin_row_id, version, deleted)
+                       VALUES (?, ?, ?, ?, ?, ?)""", (tbl, local_id, origin, origin_row_id, version, deleted))
+
+def sync(path_a, path_b):
+    """
+    Two-way delta sync between two database files.
+    """
+    a, b = prepare(path_a), prepare(path_b)
+    try:
+        return {"a_to_b": pull(a, b), "b_to_a": pull(b, a)}
+    finally:
+        a.close()
+        b.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "prepare":
+        prepare(sys.argv[2]).close()
+        print(f"{sys.argv[2]} ready for sync")
+    elif len(sys.argv) == 4 and sys.argv[1] == "sync":
+        print(sync(sys.argv[2], sys.argv[3]))
+    else:
+        print("usage: python dbsync.py prepare DB | sync DB_A DB_B")
@@ -0,0 +1,63 @@
+import datetime
+from tkinter import messagebox
+from auth import c
+from writer import get_writer
+import ratelimit
+import archive
+
+# ------------------- Post Doubt -------------------
+def post_doubt(user_id, subject, question):
+    if not user_id:
+        messagebox.showerror("Error", "User not logged in")
+        return False
+    if not ratelimit.allow("doubt", user_id):
+        messagebox.showerror("Error", "You are posting doubts too quickly. Please wait a moment.")
+        return False
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Batched with other pending writes; result() returns once the row is committed.
+    get_writer().submit("INSERT INTO doubts (user_id, subject, question, timestamp) VALUES (?, ?, ?, ?)",
+                        (user_id, subject, question, timestamp)).result()
+    messagebox.showinfo("Success", "Doubt posted.")
+    return True
+
+# ------------------- Answers -------------------
+def post_answer(user_id, doubt_id, answer):
+    if not user_id:
+        messagebox.showerror("Error", "User not logged in")
+        return False
+    if not ratelimit.allow("doubt", user_id):
+        messagebox.showerror("Error", "You are posting too quickly. Please wait a moment.")
+        return False
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    get_writer().submit("INSERT INTO answers (doubt_id, user_id, answer, timestamp) VALUES (?, ?, ?, ?)",
+                        (doubt_id, user_id, answer, timestamp)).result()
+    return True
+
+def answers_for(doubt_ids):
+    """
+    Map doubt id -> [(username, answer, timestamp)], oldest first.
+    """
+    if not doubt_ids:
+        return {}
+    marks = ",".join("?" * len(doubt_ids))
+    out = {}
+    for doubt_id, username, answer, ts in c.execute(f"""
+            SELECT answers.doubt_id, users.username, answers.answer, answers.timestamp
+            FROM answers LEFT JOIN users ON users.id = answers.user_id
+            WHERE answers.doubt_id IN ({marks}) ORDER BY answers.id""", list(doubt_ids)):
+        out.setdefault(doubt_id, []).append((username, answer, ts))
+    return out
+
+# ------------------- View Doubts -------------------
+def view_doubts(include_archive=False):
+    """
+    Return all doubts, newest first, with the poster's username.
+    """
+    sql = """
+        SELECT doubts.id, users.username, doubts.subject, doubts.question, doubts.timestamp
+        FROM doubts JOIN users ON doubts.user_id = users.id
+    """
+    if include_archive and archive.attach_archive(c):
+        sql += " UNION ALL " + archive.ARCHIVE_DOUBTS_SELECT
+    c.execute(sql + " ORDER BY 5 DESC")
+    return c.fetchall()
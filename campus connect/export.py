@@ -0,0 +1,104 @@
+import os, re, sys, shutil, zipfile, datetime
+import storage
+from auth import connect
+
+# ------------------- ZIP Export -------------------
+# Writes a set of search result rows (id, subject, topic, content, timestamp,
+# file_path) as a ZIP: one text file per note plus its attachment. Entries
+# are streamed into the archive in COPY_CHUNK pieces, so memory stays flat
+# however large the export is, and the output only has to be writable: a
+# file, a socket wrapper or an HTTP response body. Formats that are already
+# compressed are stored as-is instead of being deflated a second time.
+#
+#   python export.py "Data Structures" ds_notes.zip
+
+COPY_CHUNK = 1024 * 1024
+STORED_EXTENSIONS = {
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".zip", ".gz", ".7z", ".rar", ".docx", ".pptx", ".xlsx",
+    ".mp3", ".mp4", ".m4a", ".webm",
+}
+
+def _safe(name):
+    name = re.sub(r'[\\/:*?"<>|\r\n]+', "_", (name or "").strip())
+    return name[:80] or "untitled"
+
+def _method_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+def _note_text(row):
+    note_id, subject, topic, content, ts, file_path = row[:6]
+    lines = [f"Subject: {subject}", f"Topic: {topic}", f"Date: {ts}"]
+    if file_path:
+        lines.append(f"Attachment: {os.path.basename(file_path)}")
+    return "\n".join(lines) + "\n\n" + (content or "") + "\n"
+
+def _date_time(ts):
+    try:
+        return datetime.datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").timetuple()[:6]
+    except (TypeError, ValueError):
+        return datetime.datetime.now().timetuple()[:6]
+
+def export_notes(rows, out, db=None):
+    """
+    Stream rows into a ZIP written to `out` (a path or a writable binary
+    file object), with every attachment of each note. db is used to look
+    up attachments; by default a private connection is opened, so exports
+    can run on any thread. Returns {"notes": n, "files": n, "missing": n}.
+    """
+    counts = {"notes": 0, "files": 0, "missing": 0}
+    own = db is None
+    db = db or connect(timeout=30)
+    try:
+        with zipfile.ZipFile(out, "w", allowZip64=True) as zf:
+            _write_notes(zf, rows, db, counts)
+    finally:
+        if own:
+            db.close()
+    return counts
+
+def _write_notes(zf, rows, db, counts):
+    used = set()
+    for row in rows:
+        note_id, subject, topic, ts, file_path = row[0], row[1], row[2], row[4], row[5]
+        base = f"{_safe(subject)}/{note_id}_{_safe(topic)}"
+        info = zipfile.ZipInfo(base + ".txt", _date_time(ts))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        zf.writestr(info, _note_text(row))
+        counts["notes"] += 1
+        files = [r[0] for r in db.execute("SELECT file_path FROM attachments WHERE note_id=? ORDER BY position", (note_id,))]
+        for path in files or ([file_path] if file_path else []):
+            try:
+                local = storage.open_local(path)
+            except Exception:
+                local = None
+            if not local or not os.path.isfile(local):
+                counts["missing"] += 1
+                continue
+            name = f"{base}_{_safe(os.path.basename(path))}"
+            if name in used:
+                continue
+            used.add(name)
+            info = zipfile.ZipInfo.from_file(local, name)
+            info.compress_type = _method_for(local)
+            with open(local, "rb") as src, zf.open(info, "w", force_zip64=True) as dst:
+                shutil.copyfileobj(src, dst, COPY_CHUNK)
+            counts["files"] += 1
+
+def export_filename(label):
+    return f"campus_connect_{_safe(label).replace(' ', '_')}_{datetime.date.today():%Y%m%d}.zip"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3:
+        from auth import c
+        import subjects
+        subject_id, _ = subjects.resolve(sys.argv[1], create=False)
+        if subject_id is None:
+            sys.exit(f"Unknown subject: {sys.argv[1]}")
+        rows = c.execute("SELECT id, subject, topic, content, timestamp, file_path FROM notes "
+                         "WHERE subject_id = ? ORDER BY created_at DESC", (subject_id,))
+        print(export_notes(rows, sys.argv[2]))
+    else:
+        print("usage: python export.py SUBJECT OUT.zip")
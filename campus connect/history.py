@@ -0,0 +1,140 @@
+import json, zlib, sqlite3, difflib, datetime
+from tkinter import messagebox
+from auth import conn, c
+from writer import get_writer
+import autocomplete
+import shards
+import subjects
+
+# ------------------- Note Revisions -------------------
+# notes always holds the current version, so listing and search never read
+# this table. note_revisions keeps every version: version 1 is the content
+# as uploaded, later versions are stored as line diffs against the version
+# before them, and every SNAPSHOT_EVERY versions a full copy is stored so
+# rebuilding any version applies at most SNAPSHOT_EVERY - 1 diffs.
+#
+# A diff is a list of [start, end] ranges copied from the previous version's
+# lines and strings inserted as-is, zlib-compressed JSON.
+
+SNAPSHOT_EVERY = 10
+
+c.execute('''CREATE TABLE IF NOT EXISTS note_revisions (
+                note_id INTEGER,
+                version INTEGER,
+                kind TEXT,
+                subject TEXT,
+                topic TEXT,
+                data BLOB,
+                edited_by INTEGER,
+                edited_at TEXT,
+                PRIMARY KEY (note_id, version)
+            )''')
+conn.commit()
+
+def make_delta(old, new):
+    old_lines = (old or "").splitlines(keepends=True)
+    new_lines = (new or "").splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(new_lines[j1:j2]))
+    return ops
+
+def apply_delta(old, ops):
+    old_lines = (old or "").splitlines(keepends=True)
+    return "".join(op if isinstance(op, str) else "".join(old_lines[op[0]:op[1]]) for op in ops)
+
+def _pack(obj):
+    return zlib.compress(json.dumps(obj, separators=(",", ":")).encode("utf-8"), 9)
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+def _revision(note_id, version, old_content, new_content, subject, topic, user_id, edited_at):
+    if (version - 1) % SNAPSHOT_EVERY == 0:
+        kind, data = "snapshot", _pack(new_content or "")
+    else:
+        kind, data = "delta", _pack(make_delta(old_content, new_content))
+    return ("INSERT INTO note_revisions (note_id, version, kind, subject, topic, data, edited_by, edited_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (note_id, version, kind, subject, topic, data, user_id, edited_at))
+
+def current_version(note_id):
+    row = c.execute("SELECT MAX(version) FROM note_revisions WHERE note_id=?", (note_id,)).fetchone()
+    return row[0] or 1
+
+# ------------------- Edit Note -------------------
+def edit_note(note_id, user_id, subject, topic, content):
+    """
+    Replace a note's subject/topic/content and record the new version.
+    Only the uploader may edit. Sharded notes are changed in their shard;
+    their revisions live in the main database like everyone else's.
+    Returns True on success.
+    """
+    sharded = shards.enabled() and c.execute("SELECT 1 FROM shard_note_ids WHERE id=?", (note_id,)).fetchone() is not None
+    if sharded:
+        row = shards.find_note(note_id)[1]
+    else:
+        row = c.execute("SELECT user_id, subject, topic, content, timestamp FROM notes WHERE id=?", (note_id,)).fetchone()
+    if row is None:
+        messagebox.showerror("Error", "Note not found")
+        return False
+    owner, old_subject, old_topic, old_content, created = row
+    if owner != user_id:
+        messagebox.showerror("Error", "You can only edit your own notes")
+        return False
+    subject_id, subject = subjects.resolve(subject)
+    if (subject, topic, content) == (old_subject, old_topic, old_content):
+        return True
+
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    version = current_version(note_id)
+    statements = []
+    if version == 1:
+        # First edit: keep the uploaded text as version 1.
+        statements.append(_revision(note_id, 1, None, old_content, old_subject, old_topic, owner, created))
+    statements.append(_revision(note_id, version + 1, old_content, content, subject, topic, user_id, now))
+    if not sharded:
+        statements.append(("UPDATE notes SET subject=?, subject_id=?, topic=?, content=? WHERE id=?",
+                           (subject, subject_id, topic, content, note_id)))
+    try:
+        # The (note_id, version) key makes a concurrent edit fail instead of forking history.
+        get_writer().submit_group(statements).result()
+    except sqlite3.IntegrityError:
+        messagebox.showerror("Error", "This note was just edited by someone else. Reopen it and try again.")
+        return False
+    if sharded:
+        # After the revision is in, so a losing concurrent edit never reaches the shard.
+        shards.update_note(note_id, subject, topic, content)
+    autocomplete.index.add(subject, topic)
+    messagebox.showinfo("Success", "Note updated.")
+    return True
+
+# ------------------- Read History -------------------
+def list_versions(note_id):
+    """
+    [(version, subject, topic, edited_by username, edited_at)], newest first.
+    """
+    c.execute("""SELECT note_revisions.version, note_revisions.subject, note_revisions.topic,
+                        users.username, note_revisions.edited_at
+                 FROM note_revisions LEFT JOIN users ON users.id = note_revisions.edited_by
+                 WHERE note_id=? ORDER BY version DESC""", (note_id,))
+    return c.fetchall()
+
+def get_version(note_id, version):
+    """
+    Rebuild the content of one version from the nearest snapshot at or
+    before it. Returns None if the version does not exist.
+    """
+    base = ((version - 1) // SNAPSHOT_EVERY) * SNAPSHOT_EVERY + 1
+    rows = c.execute("SELECT version, kind, data FROM note_revisions WHERE note_id=? AND version BETWEEN ? AND ? "
+                     "ORDER BY version", (note_id, base, version)).fetchall()
+    if not rows or rows[-1][0] != version or rows[0][1] != "snapshot":
+        return None
+    content = None
+    for _, kind, data in rows:
+        content = _unpack(data) if kind == "snapshot" else apply_delta(content, _unpack(data))
+    return content
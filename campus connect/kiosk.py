@@ -0,0 +1,78 @@
+import os, time, sqlite3, threading, traceback
+from auth import KIOSK, conn, copy_snapshot
+import tags
+import autocomplete
+import subjects
+
+# ------------------- Kiosk Mode -------------------
+# With CAMPUS_KIOSK=1 the app browses a snapshot of the database held in a
+# shared in-memory database (auth.SNAPSHOT_URI) and never writes to the
+# file: main_app hides every write action and get_writer() refuses. Every
+# REFRESH_SECONDS a background thread copies the file into a private
+# in-memory database; the Tk loop then copies that into the shared snapshot
+# between events, so a search sees either the old or the new snapshot and
+# never waits on the writers of the real database.
+#
+# The database file must already have the full schema (run the normal app
+# against it once); tables created by module imports exist only in memory
+# until the next refresh replaces them.
+#
+#   CAMPUS_KIOSK=1 python main_app.py
+
+REFRESH_SECONDS = float(os.environ.get("CAMPUS_KIOSK_REFRESH_SECONDS", "300"))
+
+_lock = threading.Lock()
+_pending = None
+last_refresh = time.time()
+
+def _load():
+    global _pending
+    fresh = sqlite3.connect(":memory:", check_same_thread=False)
+    copy_snapshot(fresh)
+    with _lock:
+        if _pending is not None:
+            _pending.close()
+        _pending = fresh
+
+def _refresh_loop():
+    while True:
+        time.sleep(REFRESH_SECONDS)
+        try:
+            _load()
+        except sqlite3.Error:
+            pass   # file busy or missing; keep serving the current snapshot
+
+def swap():
+    """
+    Install a snapshot loaded in the background, if one is ready. Call on
+    the thread that owns auth.conn. Returns True if the snapshot changed.
+    """
+    global _pending, last_refresh
+    with _lock:
+        fresh, _pending = _pending, None
+    if fresh is None:
+        return False
+    fresh.backup(conn)   # memory to memory: milliseconds
+    fresh.close()
+    tags.index.invalidate()
+    autocomplete.index.invalidate()
+    subjects.cache.invalidate()
+    last_refresh = time.time()
+    return True
+
+def start(root, poll_ms=1000):
+    """
+    Start background refreshes and poll for finished ones from the Tk loop.
+    """
+    if not KIOSK:
+        return
+    threading.Thread(target=_refresh_loop, name="campus-kiosk-refresh", daemon=True).start()
+
+    def poll():
+        try:
+            swap()
+        except Exception:
+            traceback.print_exc()   # keep the current snapshot; the next refresh retries
+        finally:
+            root.after(poll_ms, poll)
+    root.after(poll_ms, poll)
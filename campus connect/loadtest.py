@@ -0,0 +1,155 @@
+import os, sys, time, random, sqlite3, argparse, tempfile
+import multiprocessing as mp
+
+# ------------------- Load Generator -------------------
+# Simulates many students against the app's core functions. Every simulated
+# user is its own process (the modules share one SQLite connection per
+# process, exactly like a real app instance), and all of them hit the same
+# database in --workdir.
+#
+#   python loadtest.py --users 32 --duration 60 --workdir /tmp/cc_load
+
+DEFAULT_MIX = "register=1,login=3,upload=2,search=10,doubt=2"
+
+
+class HeadlessMessages:
+    """
+    Stands in for tkinter.messagebox inside worker processes so the core
+    functions can run without a display. Errors are remembered so the
+    caller can count them as failed operations.
+    """
+    def __init__(self):
+        self.last_error = None
+
+    def showerror(self, title, message):
+        self.last_error = message
+
+    def showinfo(self, title, message):
+        pass
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+def _make_attachment(size):
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def run_user(args):
+    """
+    One simulated student. Returns a list of (operation, seconds, outcome)
+    where outcome is "ok", "error" or "locked".
+    """
+    user_index, opts = args
+    os.chdir(opts["workdir"])
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import auth, upload, search, doubts
+    messages = HeadlessMessages()
+    upload.messagebox = search.messagebox = doubts.messagebox = messages
+
+    rng = random.Random(opts["seed"] + user_index)
+    username = f"load_{os.getpid()}_{user_index}"
+    password = "secret"
+    auth.register_user(username, password)
+    user_id = auth.login_user(username, password)[0]
+    attachment = _make_attachment(opts["attachment_bytes"])
+    subjects = ["Data Structures", "Operating Systems", "Networks", "DBMS", "Maths"]
+
+    def upload_note():
+        # upload.upload_note's steps without its dialogs: finish_upload turns
+        # every exception into an error message, which would hide "locked".
+        paths = [attachment] if rng.random() < opts["attach_ratio"] else []
+        if upload.check_upload(user_id, paths):
+            return False
+        return upload.save_upload(user_id, rng.choice(subjects), f"Topic {rng.randint(1, 50)}",
+                                  "load test note " * 20, upload.stage_files(paths))
+
+    ops = {
+        "register": lambda: auth.register_user(f"{username}_{rng.random()}", password),
+        "login": lambda: auth.login_user(username, password),
+        "upload": upload_note,
+        "search": lambda: search.search_notes(rng.choice(subjects + ["Topic 1", "note", "xyz"]), user_id),
+        "doubt": lambda: doubts.post_doubt(user_id, rng.choice(subjects), "How does this work?"),
+    }
+    names = list(opts["mix"])
+    weights = [opts["mix"][n] for n in names]
+    results = []
+    deadline = time.time() + opts["duration"]
+    while time.time() < deadline:
+        name = rng.choices(names, weights)[0]
+        messages.last_error = None
+        start = time.perf_counter()
+        try:
+            value = ops[name]()
+            outcome = "error" if messages.last_error or value is False else "ok"
+        except sqlite3.OperationalError as e:
+            outcome = "locked" if "locked" in str(e) else "error"
+        except Exception:
+            outcome = "error"
+        results.append((name, time.perf_counter() - start, outcome))
+        if opts["think_time"]:
+            time.sleep(rng.expovariate(1 / opts["think_time"]))
+    os.remove(attachment)
+    return results
+
+
+def report(all_results, elapsed):
+    by_op = {}
+    for name, seconds, outcome in all_results:
+        by_op.setdefault(name, []).append((seconds, outcome))
+    lines = [f"{'operation':<10} {'count':>7} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'locked':>7}"]
+    for name in sorted(by_op):
+        samples = by_op[name]
+        lat = sorted(s * 1000 for s, _ in samples)
+        errors = sum(1 for _, o in samples if o == "error")
+        locked = sum(1 for _, o in samples if o == "locked")
+        lines.append(f"{name:<10} {len(samples):>7} {len(samples) / elapsed:>8.1f} {_percentile(lat, 50):>8.2f} "
+                     f"{_percentile(lat, 95):>8.2f} {_percentile(lat, 99):>8.2f} {errors:>7} {locked:>7}")
+    lines.append(f"total: {len(all_results)} ops in {elapsed:.1f}s = {len(all_results) / elapsed:.1f} ops/s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Campus Connect load generator")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="seconds per user")
+    parser.add_argument("--think-time", type=float, default=0.05, help="mean seconds between ops (0 = none)")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--attach-ratio", type=float, default=0.5)
+    parser.add_argument("--attachment-bytes", type=int, default=200 * 1024)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "campus_connect_load"))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--respect-limits", action="store_true",
+                        help="keep per-user rate limits and quotas instead of lifting them")
+    a = parser.parse_args(argv)
+
+    os.makedirs(os.path.join(a.workdir, "uploads"), exist_ok=True)
+    if not a.respect_limits:
+        for action in ("UPLOAD", "SEARCH", "DOUBT"):
+            os.environ[f"CAMPUS_RATE_{action}"] = "1000000:1000000"
+        os.environ["CAMPUS_QUOTA_MB"] = "1000000"
+        os.environ["CAMPUS_QUOTA_FILES"] = "100000000"
+    opts = {"workdir": a.workdir, "duration": a.duration, "think_time": a.think_time, "mix": parse_mix(a.mix),
+            "attach_ratio": a.attach_ratio, "attachment_bytes": a.attachment_bytes, "seed": a.seed}
+
+    start = time.time()
+    with mp.Pool(a.users) as pool:
+        per_user = pool.map(run_user, [(i, opts) for i in range(a.users)])
+    elapsed = time.time() - start
+    print(report([r for results in per_user for r in results], elapsed))
+
+
+if __name__ == "__main__":
+    main()
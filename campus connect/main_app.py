@@ -1,9 +1,24 @@
 import customtkinter as ctk
 from tkinter import scrolledtext, filedialog, messagebox
-from auth import register_user, login_user
-from upload import upload_note
+from auth import KIOSK, register_user, login_user
+import upload
 from search import search_notes, open_file
+from doubts import post_doubt, view_doubts, post_answer, answers_for
+from viewer import AttachmentViewer, can_view
+from changes import latest_seq, changes_since
+from tags import parse_tags, tags_for
+from popularity import record_view, stats_for, trending
+from attachments import attachments_for
+import storage
+import export
+import autocomplete
+import history
+import subjects
+from unified import unified_search
 import os
+import threading
+import profiler
+import kiosk
 
 class CampusConnectApp:
     def __init__(self, master):
@@ -14,9 +29,14 @@ class CampusConnectApp:
         self.master.geometry("600x520")
         self.user_id = None
         self.username = None
-        self.login_screen()
+        if KIOSK:
+            self.username = "Guest"
+            self.main_screen()
+        else:
+            self.login_screen()
 
     # ----------------- Login/Register -----------------
+    @profiler.timed("login_screen")
     def login_screen(self):
         for w in self.master.winfo_children():
             w.destroy()
@@ -30,6 +50,7 @@ class CampusConnectApp:
         ctk.CTkButton(self.master, text="Login", width=120, command=self.login).pack(pady=10)
         ctk.CTkButton(self.master, text="Register", width=120, command=self.register).pack(pady=5)
 
+    @profiler.timed("register")
     def register(self):
         user = self.username_entry.get().strip()
         pwd = self.password_entry.get().strip()
@@ -41,6 +62,7 @@ class CampusConnectApp:
         else:
             messagebox.showerror("Error", "Enter both fields.")
 
+    @profiler.timed("login")
     def login(self):
         user = self.username_entry.get().strip()
         pwd = self.password_entry.get().strip()
@@ -53,91 +75,481 @@ class CampusConnectApp:
             messagebox.showerror("Error", "Invalid credentials.")
 
     # ----------------- Main Menu -----------------
+    @profiler.timed("main_screen")
     def main_screen(self):
         for w in self.master.winfo_children():
             w.destroy()
+        if KIOSK:
+            # Read-only kiosk: browsing and search only.
+            ctk.CTkLabel(self.master, text="Campus Connect Kiosk", font=("Arial", 20, "bold")).pack(pady=20)
+            ctk.CTkButton(self.master, text="Search Notes", width=200, command=self.search_screen).pack(pady=10)
+            ctk.CTkButton(self.master, text="Search Everything", width=200, command=self.unified_search_screen).pack(pady=10)
+            ctk.CTkButton(self.master, text="View Doubts", width=200, command=self.view_doubts_screen).pack(pady=10)
+            return
         ctk.CTkLabel(self.master, text=f"Welcome, {self.username}", font=("Arial", 20, "bold")).pack(pady=20)
         ctk.CTkButton(self.master, text="Upload Note", width=200, command=self.upload_screen).pack(pady=10)
         ctk.CTkButton(self.master, text="Search Notes", width=200, command=self.search_screen).pack(pady=10)
+        ctk.CTkButton(self.master, text="Search Everything", width=200, command=self.unified_search_screen).pack(pady=10)
+        ctk.CTkButton(self.master, text="Post Doubt", width=200, command=self.post_doubt_screen).pack(pady=10)
+        ctk.CTkButton(self.master, text="View Doubts", width=200, command=self.view_doubts_screen).pack(pady=10)
         ctk.CTkButton(self.master, text="Logout", width=200, fg_color="#d9534f", command=self.login_screen).pack(pady=20)
 
     # ----------------- Upload Note -----------------
+    @profiler.timed("upload_screen")
     def upload_screen(self):
         win = ctk.CTkToplevel(self.master)
         win.title("Upload Note")
-        win.geometry("500x500")
+        win.geometry("500x600")
 
         subject = ctk.CTkEntry(win, placeholder_text="Subject", width=400)
         subject.pack(pady=5)
         topic = ctk.CTkEntry(win, placeholder_text="Topic", width=400)
         topic.pack(pady=5)
+        tags_entry = ctk.CTkEntry(win, placeholder_text="Tags (e.g. midterm, unit-3)", width=400)
+        tags_entry.pack(pady=5)
         content_text = scrolledtext.ScrolledText(win, width=50, height=10)
         content_text.pack(pady=10)
 
-        selected = {"path": None}
+        selected = {"paths": []}
 
-        # Label to show selected file
+        # Label to show selected files
         file_label = ctk.CTkLabel(win, text="No file selected", anchor="w")
         file_label.pack(pady=4)
+        progress = ctk.CTkProgressBar(win, width=400)
+        progress.set(0)
+
+        def show_selection(paths):
+            selected["paths"] = paths
+            if not paths:
+                file_label.configure(text="No file selected")
+            elif len(paths) == 1:
+                file_label.configure(text=f"Attached: {os.path.basename(paths[0])}")
+            else:
+                size = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+                file_label.configure(text=f"Attached: {len(paths)} files ({size:.1f} MB)")
 
         def choose_file():
-            path = filedialog.askopenfilename(
-                title="Select PDF or Image",
-                filetypes=[("PDF files", "*.pdf"), ("Image files", "*.png;*.jpg;*.jpeg")]
+            paths = filedialog.askopenfilenames(
+                title="Select PDFs or Images",
+                filetypes=[("PDF files", "*.pdf"), ("Image files", "*.png;*.jpg;*.jpeg"), ("All files", "*.*")]
             )
-            if path:
-                selected["path"] = path
-                file_label.configure(text=f"Attached: {os.path.basename(path)}")
+            if paths:
+                show_selection(list(paths))
+
+        def choose_folder():
+            folder = filedialog.askdirectory(title="Select Folder")
+            if folder:
+                show_selection(upload.list_folder(folder))
 
-        ctk.CTkButton(win, text="Choose File", command=choose_file).pack(pady=5)
+        pickers = ctk.CTkFrame(win, fg_color="transparent")
+        pickers.pack(pady=5)
+        ctk.CTkButton(pickers, text="Choose Files", command=profiler.wrap("choose_file", choose_file)).pack(side="left", padx=5)
+        ctk.CTkButton(pickers, text="Choose Folder", command=profiler.wrap("choose_folder", choose_folder)).pack(side="left", padx=5)
 
         def submit_note():
             s = subject.get()
             t = topic.get()
             c = content_text.get("1.0", "end").strip()
-            f = selected["path"]
-            if s and t:
-                upload_note(self.user_id, s, t, c, f)
-                win.destroy()
-            else:
+            paths = selected["paths"]
+            if not (s and t):
                 messagebox.showerror("Error", "Subject and Topic are required.")
+                return
+            error = upload.check_upload(self.user_id, paths)
+            if error:
+                messagebox.showerror("Error", error)
+                return
+            tag_names = parse_tags(tags_entry.get())
+            # Copy, hash and save on a worker thread; the Tk loop only polls
+            # progress and shows the outcome.
+            state = {"done": 0, "total": 1, "finished": False, "error": None, "savings": []}
+
+            def report(done, total):
+                state["done"], state["total"] = done, max(total, 1)
 
-        ctk.CTkButton(win, text="Upload", command=submit_note).pack(pady=10)
+            def run():
+                try:
+                    try:
+                        staged = upload.stage_files(paths, report)
+                    except Exception as e:
+                        raise RuntimeError(f"File copy failed: {e}") from e
+                    try:
+                        upload.save_upload(self.user_id, s, t, c, staged, tag_names, state["savings"])
+                    except Exception as e:
+                        raise RuntimeError(f"Upload failed: {e}") from e
+                except Exception as e:
+                    state["error"] = e
+                state["finished"] = True
+
+            def poll():
+                progress.set(state["done"] / state["total"])
+                if not state["finished"]:
+                    win.after(100, poll)
+                    return
+                upload_button.configure(state="normal")
+                if state["error"] is not None:
+                    messagebox.showerror("Error", str(state["error"]))
+                else:
+                    messagebox.showinfo("Success", upload.success_message(state["savings"]))
+                    win.destroy()
+
+            upload_button.configure(state="disabled")
+            if paths:
+                progress.pack(pady=4)
+            threading.Thread(target=run, daemon=True).start()
+            win.after(100, poll)
+
+        upload_button = ctk.CTkButton(win, text="Upload", command=profiler.wrap("submit_note", submit_note))
+        upload_button.pack(pady=10)
 
     # ----------------- Search Notes -----------------
+    @profiler.timed("search_screen")
     def search_screen(self):
         win = ctk.CTkToplevel(self.master)
         win.title("Search Notes")
         win.geometry("700x500")
 
         keyword = ctk.CTkEntry(win, placeholder_text="Enter keyword", width=300)
-        keyword.pack(pady=10)
+        keyword.pack(pady=(10, 5))
+        suggestion_bar = ctk.CTkFrame(win, fg_color="transparent")
+        suggestion_bar.pack(pady=(0, 5))
+        tag_filter = ctk.CTkEntry(win, placeholder_text="Tags: midterm unit-3|unit-4 -solved", width=300)
+        tag_filter.pack(pady=(0, 5))
+        filters = ctk.CTkFrame(win, fg_color="transparent")
+        filters.pack(pady=(0, 5))
+        subject_filter = ctk.CTkComboBox(filters, values=[""] + [name for _, name, _ in subjects.facets()], width=160)
+        subject_filter.set("")
+        subject_filter.pack(side="left", padx=3)
+        uploader_filter = ctk.CTkEntry(filters, placeholder_text="Uploader", width=120)
+        uploader_filter.pack(side="left", padx=3)
+        date_from = ctk.CTkEntry(filters, placeholder_text="From YYYY-MM-DD", width=130)
+        date_from.pack(side="left", padx=3)
+        date_to = ctk.CTkEntry(filters, placeholder_text="To YYYY-MM-DD", width=130)
+        date_to.pack(side="left", padx=3)
+        sort_choice = ctk.CTkOptionMenu(win, values=["Newest", "Trending"], width=140)
+        sort_choice.pack(pady=(0, 5))
+        include_archive = ctk.CTkCheckBox(win, text="Include archive")
+        include_archive.pack(pady=(0, 10))
         result_frame = ctk.CTkScrollableFrame(win, width=650, height=400)
         result_frame.pack()
 
-        def perform_search():
+        shown = []
+
+        def render_results(results):
+            shown[:] = results
             for w in result_frame.winfo_children():
                 w.destroy()
-            results = search_notes(keyword.get())
             if not results:
                 ctk.CTkLabel(result_frame, text="No results found").pack(pady=10)
                 return
+            note_tags = tags_for([row[0] for row in results])
+            note_stats = stats_for([row[0] for row in results])
+            note_files = attachments_for([row[0] for row in results])
             for row in results:
                 subject, topic, content, ts, file_path = row[1], row[2], row[3], row[4], row[5]
                 frame = ctk.CTkFrame(result_frame)
                 frame.pack(fill="x", pady=5, padx=5)
                 ctk.CTkLabel(frame, text=f"{subject} - {topic}", font=("Arial", 14, "bold")).pack(anchor="w", padx=5)
-                ctk.CTkLabel(frame, text=f"Date: {ts}", font=("Arial", 10)).pack(anchor="w", padx=5)
+                views, downloads = note_stats.get(row[0], (0, 0))
+                ctk.CTkLabel(frame, text=f"Date: {ts}    Views: {views + downloads}", font=("Arial", 10)).pack(anchor="w", padx=5)
+                if row[0] in note_tags:
+                    ctk.CTkLabel(frame, text="Tags: " + ", ".join(note_tags[row[0]]), font=("Arial", 10)).pack(anchor="w", padx=5)
                 if content:
                     ctk.CTkLabel(frame, text=content[:200] + "...", wraplength=620, justify="left").pack(anchor="w", padx=5)
-                if file_path:
-                    ctk.CTkLabel(frame, text=f"Attached file: {os.path.basename(file_path)}").pack(anchor="w", padx=5)
-                    ctk.CTkButton(frame, text="Open File", command=lambda p=file_path: open_file(p)).pack(anchor="e", padx=5, pady=5)
+                files = note_files.get(row[0]) or ([file_path] if file_path else [])
+                if len(files) == 1:
+                    ctk.CTkLabel(frame, text=f"Attached file: {os.path.basename(files[0])}").pack(anchor="w", padx=5)
+                    ctk.CTkButton(frame, text="Open File", command=lambda i=row[0], p=files[0]: self.show_attachment(i, p)).pack(anchor="e", padx=5, pady=5)
+                elif files:
+                    ctk.CTkLabel(frame, text=f"Attached files: {len(files)}").pack(anchor="w", padx=5)
+                    for path in files:
+                        line = ctk.CTkFrame(frame, fg_color="transparent")
+                        line.pack(fill="x", padx=5)
+                        ctk.CTkLabel(line, text=os.path.basename(path), anchor="w").pack(side="left")
+                        ctk.CTkButton(line, text="Open", width=60, command=lambda i=row[0], p=path: self.show_attachment(i, p)).pack(side="right", pady=2)
+                actions = ctk.CTkFrame(frame, fg_color="transparent")
+                actions.pack(anchor="e", padx=5, pady=(0, 5))
+                if not KIOSK:
+                    ctk.CTkButton(actions, text="Edit", width=70, command=lambda r=row: self.edit_note_screen(r)).pack(side="left", padx=2)
+                ctk.CTkButton(actions, text="History", width=70, command=lambda i=row[0]: self.history_screen(i)).pack(side="left", padx=2)
+
+        def perform_search():
+            sort = "trending" if sort_choice.get() == "Trending" else "recent"
+            try:
+                results = search_notes(keyword.get(), self.user_id, tag_filter.get().strip() or None, sort,
+                                       bool(include_archive.get()), subject=subject_filter.get().strip() or None,
+                                       since=date_from.get().strip() or None, until=date_to.get().strip() or None,
+                                       uploader=uploader_filter.get().strip() or None)
+            except ValueError:
+                messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format")
+                return
+            render_results(results)
+
+        def show_trending():
+            render_results(trending())
+
+        def pick_suggestion(text):
+            keyword.delete(0, "end")
+            keyword.insert(0, text)
+            perform_search()
 
-        ctk.CTkButton(win, text="Search", command=perform_search).pack(pady=5)
+        def update_suggestions(event=None):
+            for w in suggestion_bar.winfo_children():
+                w.destroy()
+            prefix = keyword.get().strip()
+            if len(prefix) < 2:
+                return
+            for text in autocomplete.index.suggest(prefix, 5):
+                if text.lower() != prefix.lower():
+                    ctk.CTkButton(suggestion_bar, text=text, height=22, fg_color="gray30",
+                                  command=lambda t=text: pick_suggestion(t)).pack(side="left", padx=2)
+
+        keyword.bind("<KeyRelease>", update_suggestions)
+
+        def export_results():
+            if not shown:
+                messagebox.showerror("Error", "Nothing to export. Run a search first.")
+                return
+            label = subject_filter.get().strip() or keyword.get().strip() or "notes"
+            out = filedialog.asksaveasfilename(parent=win, defaultextension=".zip",
+                                               initialfile=export.export_filename(label),
+                                               filetypes=[("ZIP archive", "*.zip")])
+            if not out:
+                return
+            rows = list(shown)
+
+            def run():
+                try:
+                    counts = export.export_notes(rows, out)
+                    msg = f"Exported {counts['notes']} notes and {counts['files']} files"
+                    if counts["missing"]:
+                        msg += f" ({counts['missing']} attachments missing)"
+                    win.after(0, lambda: messagebox.showinfo("Export", msg))
+                except Exception as e:
+                    win.after(0, lambda: messagebox.showerror("Error", f"Export failed: {e}"))
+            threading.Thread(target=run, daemon=True).start()
+
+        buttons = ctk.CTkFrame(win, fg_color="transparent")
+        buttons.pack(pady=5)
+        ctk.CTkButton(buttons, text="Search", command=profiler.wrap("perform_search", perform_search)).pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Trending", command=profiler.wrap("show_trending", show_trending)).pack(side="left", padx=5)
+        if not KIOSK:
+            ctk.CTkButton(buttons, text="Export ZIP", command=profiler.wrap("export_results", export_results)).pack(side="left", padx=5)
+
+    @profiler.timed("show_attachment")
+    def show_attachment(self, note_id, path):
+        record_view(note_id)
+        # Built-in viewer when the format is supported, system viewer otherwise.
+        try:
+            local = storage.open_local(path)
+        except Exception:
+            local = None   # open_file reports the error
+        if local and can_view(local):
+            AttachmentViewer(self.master, local)
+        else:
+            open_file(path)
+
+    # ----------------- Unified Search -----------------
+    @profiler.timed("unified_search_screen")
+    def unified_search_screen(self):
+        win = ctk.CTkToplevel(self.master)
+        win.title("Search Notes, Doubts and Answers")
+        win.geometry("700x560")
+
+        query = ctk.CTkEntry(win, placeholder_text="Search notes, doubts and answers", width=400)
+        query.pack(pady=10)
+        result_frame = ctk.CTkScrollableFrame(win, width=650, height=400)
+        result_frame.pack()
+        pager = ctk.CTkFrame(win, fg_color="transparent")
+        pager.pack(pady=5)
+        state = {"page": 0, "text": ""}
+        badges = {"note": ("NOTE", "#3a7ebf"), "doubt": ("DOUBT", "#d9534f"), "answer": ("ANSWER", "#2e8b57")}
+
+        def load(page):
+            items, has_more = unified_search(state["text"], page)
+            state["page"] = page
+            for w in result_frame.winfo_children():
+                w.destroy()
+            if not items:
+                ctk.CTkLabel(result_frame, text="No results found").pack(pady=10)
+            for item in items:
+                frame = ctk.CTkFrame(result_frame)
+                frame.pack(fill="x", pady=5, padx=5)
+                header = ctk.CTkFrame(frame, fg_color="transparent")
+                header.pack(anchor="w", padx=5, pady=(5, 0))
+                label, color = badges[item["type"]]
+                ctk.CTkLabel(header, text=f" {label} ", fg_color=color, corner_radius=6, font=("Arial", 10, "bold")).pack(side="left")
+                ctk.CTkLabel(header, text=f"  {item['title']}", font=("Arial", 14, "bold")).pack(side="left")
+                ctk.CTkLabel(frame, text=f"Date: {item['timestamp']}", font=("Arial", 10)).pack(anchor="w", padx=5)
+                ctk.CTkLabel(frame, text=item["snippet"] or "", wraplength=620, justify="left").pack(anchor="w", padx=5)
+                if item["file_path"]:
+                    ctk.CTkButton(frame, text="Open File", command=lambda i=item["id"], p=item["file_path"]: self.show_attachment(i, p)).pack(anchor="e", padx=5, pady=5)
+            prev_button.configure(state="normal" if page > 0 else "disabled")
+            next_button.configure(state="normal" if has_more else "disabled")
+            page_label.configure(text=f"Page {page + 1}")
+
+        def perform_search():
+            state["text"] = query.get()
+            load(0)
+
+        prev_button = ctk.CTkButton(pager, text="< Prev", width=80, state="disabled", command=lambda: load(state["page"] - 1))
+        prev_button.pack(side="left", padx=5)
+        page_label = ctk.CTkLabel(pager, text="")
+        page_label.pack(side="left", padx=5)
+        next_button = ctk.CTkButton(pager, text="Next >", width=80, state="disabled", command=lambda: load(state["page"] + 1))
+        next_button.pack(side="left", padx=5)
+        query.bind("<Return>", lambda event: perform_search())
+        ctk.CTkButton(win, text="Search", command=profiler.wrap("unified_search", perform_search)).pack(pady=5)
+
+    # ----------------- Edit Notes -----------------
+    @profiler.timed("edit_note_screen")
+    def edit_note_screen(self, row):
+        note_id, subject_text, topic_text, content_text = row[0], row[1], row[2], row[3]
+        win = ctk.CTkToplevel(self.master)
+        win.title("Edit Note")
+        win.geometry("500x500")
+
+        subject = ctk.CTkEntry(win, width=400)
+        subject.insert(0, subject_text or "")
+        subject.pack(pady=5)
+        topic = ctk.CTkEntry(win, width=400)
+        topic.insert(0, topic_text or "")
+        topic.pack(pady=5)
+        content = scrolledtext.ScrolledText(win, width=50, height=15)
+        content.insert("1.0", content_text or "")
+        content.pack(pady=10)
+
+        def save():
+            if history.edit_note(note_id, self.user_id, subject.get(), topic.get(), content.get("1.0", "end-1c")):
+                win.destroy()
+
+        ctk.CTkButton(win, text="Save", command=profiler.wrap("save_edit", save)).pack(pady=10)
+
+    @profiler.timed("history_screen")
+    def history_screen(self, note_id):
+        win = ctk.CTkToplevel(self.master)
+        win.title("Note History")
+        win.geometry("600x500")
+
+        versions = history.list_versions(note_id)
+        listing = ctk.CTkScrollableFrame(win, width=550, height=180)
+        listing.pack(pady=5)
+        preview = scrolledtext.ScrolledText(win, width=70, height=14)
+        preview.pack(pady=5)
+        if not versions:
+            ctk.CTkLabel(listing, text="This note has not been edited").pack(pady=10)
+            return
+
+        def show(version):
+            preview.delete("1.0", "end")
+            preview.insert("1.0", history.get_version(note_id, version) or "")
+
+        for version, subject, topic, editor, edited_at in versions:
+            ctk.CTkButton(listing, text=f"v{version}  {edited_at}  {editor or ''}  {subject} - {topic}", anchor="w",
+                          command=lambda v=version: show(v)).pack(fill="x", pady=2)
+        show(versions[0][0])
+
+    # ----------------- Doubts -----------------
+    @profiler.timed("post_doubt_screen")
+    def post_doubt_screen(self):
+        win = ctk.CTkToplevel(self.master)
+        win.title("Post Doubt")
+        win.geometry("500x400")
+
+        subject = ctk.CTkEntry(win, placeholder_text="Subject", width=400)
+        subject.pack(pady=5)
+        question_text = scrolledtext.ScrolledText(win, width=50, height=10)
+        question_text.pack(pady=10)
+
+        def submit_doubt():
+            s = subject.get()
+            q = question_text.get("1.0", "end").strip()
+            if s and q:
+                if post_doubt(self.user_id, s, q):
+                    win.destroy()
+            else:
+                messagebox.showerror("Error", "Subject and Question are required.")
+
+        ctk.CTkButton(win, text="Post", command=profiler.wrap("submit_doubt", submit_doubt)).pack(pady=10)
+
+    @profiler.timed("view_doubts_screen")
+    def view_doubts_screen(self):
+        win = ctk.CTkToplevel(self.master)
+        win.title("View Doubts")
+        win.geometry("700x500")
+
+        result_frame = ctk.CTkScrollableFrame(win, width=650, height=450)
+        result_frame.pack(pady=10)
+
+        # Render the full list once, then apply only rows from the change feed.
+        cursor = {"seq": latest_seq()}
+        shown = {}
+        answer_boxes = {}
+        empty_label = ctk.CTkLabel(result_frame, text="No doubts posted yet.")
+
+        def render_doubt(row, on_top=False):
+            doubt_id, username, subject, question, ts = row
+            frame = ctk.CTkFrame(result_frame)
+            children = [w for w in result_frame.winfo_children() if w is not frame and w is not empty_label]
+            if on_top and children:
+                frame.pack(fill="x", pady=5, padx=5, before=children[0])
+            else:
+                frame.pack(fill="x", pady=5, padx=5)
+            ctk.CTkLabel(frame, text=f"{subject} - by {username}", font=("Arial", 14, "bold")).pack(anchor="w", padx=5)
+            ctk.CTkLabel(frame, text=f"Date: {ts}", font=("Arial", 10)).pack(anchor="w", padx=5)
+            ctk.CTkLabel(frame, text=question, wraplength=620, justify="left").pack(anchor="w", padx=5)
+            answer_box = ctk.CTkFrame(frame, fg_color="transparent")
+            answer_box.pack(fill="x", padx=20)
+            answer_boxes[doubt_id] = answer_box
+            render_answers(answer_box, answers.get(doubt_id, []))
+            if not KIOSK:
+                ctk.CTkButton(frame, text="Answer", width=80,
+                              command=lambda d=doubt_id, box=answer_box: answer_doubt(d, box)).pack(anchor="e", padx=5, pady=5)
+            shown[doubt_id] = frame
+
+        def render_answers(box, rows):
+            for w in box.winfo_children():
+                w.destroy()
+            for username, answer, ts in rows:
+                ctk.CTkLabel(box, text=f"{username} ({ts}): {answer}", wraplength=580, justify="left",
+                             font=("Arial", 11)).pack(anchor="w")
+
+        def answer_doubt(doubt_id, box):
+            text = ctk.CTkInputDialog(text="Your answer:", title="Answer Doubt").get_input()
+            if text and text.strip() and post_answer(self.user_id, doubt_id, text.strip()):
+                render_answers(box, answers_for([doubt_id]).get(doubt_id, []))
+
+        def apply_changes():
+            if not win.winfo_exists():
+                return
+            items, cursor["seq"] = changes_since(cursor["seq"], ("doubt", "answer"))
+            for change in items:
+                if change["entity"] == "answer":
+                    doubt_id = change["row"][1] if change["row"] else None
+                    if doubt_id in shown:
+                        render_answers(answer_boxes[doubt_id], answers_for([doubt_id]).get(doubt_id, []))
+                    continue
+                old = shown.pop(change["id"], None)
+                if old is not None:
+                    old.destroy()
+                if change["row"] is not None:
+                    empty_label.pack_forget()
+                    render_doubt(change["row"], on_top=True)
+            if not shown:
+                empty_label.pack(pady=10)
+            win.after(2000, apply_changes)
 
+        rows = view_doubts()
+        answers = answers_for([row[0] for row in rows])
+        for row in rows:
+            render_doubt(row)
+        if not shown:
+            empty_label.pack(pady=10)
+        win.after(2000, apply_changes)
 
 if __name__ == "__main__":
     root = ctk.CTk()
     app = CampusConnectApp(root)
+    autocomplete.index.warm()
+    profiler.start(root)
+    kiosk.start(root)
     root.mainloop()
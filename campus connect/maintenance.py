@@ -0,0 +1,198 @@
+import os, sys, time, shutil, hashlib, sqlite3, threading
+from auth import DB_PATH, conn, c
+from ratelimit import TokenBucket
+import shards
+import attachments  # creates attachments
+import changes
+
+# ------------------- Uploads Maintenance -------------------
+# Reconciles uploads/ against notes.file_path and scrubs attachment checksums
+# in the background. Runs with its own connection so it can live in a
+# separate thread or process next to the app.
+
+UPLOAD_DIR = "uploads"
+QUARANTINE_DIR = "uploads_quarantine"
+
+c.execute('''CREATE TABLE IF NOT EXISTS file_checksums (
+                file_path TEXT PRIMARY KEY,
+                sha256 TEXT,
+                size INTEGER,
+                verified_at TEXT,
+                status TEXT
+            )''')
+conn.commit()
+
+def file_sha256(path, bucket=None, chunk_size=256 * 1024):
+    """
+    Hash a file in chunks. With a TokenBucket, each chunk waits for its
+    bytes to be available so the scrub stays under the I/O budget.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if bucket:
+                bucket.consume(len(chunk))
+            h.update(chunk)
+    return h.hexdigest()
+
+def _now():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+def _connect():
+    return sqlite3.connect(DB_PATH, timeout=30)
+
+# ------------------- Orphans and Missing Files -------------------
+def scan_uploads(batch_size=500, grace_seconds=300):
+    """
+    Stream uploads/ with os.scandir and yield batches of file paths.
+    Files newer than grace_seconds are skipped: they may belong to an
+    upload whose INSERT has not committed yet.
+    """
+    if not os.path.isdir(UPLOAD_DIR):
+        return
+    cutoff = time.time() - grace_seconds
+    batch = []
+    with os.scandir(UPLOAD_DIR) as it:
+        for entry in it:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                continue
+            batch.append(os.path.join(UPLOAD_DIR, entry.name))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def _referenced(db, batch):
+    marks = ",".join("?" * len(batch))
+    sql = f"SELECT file_path FROM notes WHERE file_path IN ({marks})"
+    referenced = {row[0] for row in db.execute(sql, batch)}
+    referenced.update(row[0] for row in db.execute(f"SELECT file_path FROM attachments WHERE file_path IN ({marks})", batch))
+    if shards.enabled():
+        for index in shards.existing_shards():
+            shard = shards.connect_shard(index)
+            referenced.update(row[0] for row in shard.execute(sql, batch))
+            shard.close()
+    return referenced
+
+def find_orphans(db, batch_size=500, grace_seconds=300):
+    for batch in scan_uploads(batch_size, grace_seconds):
+        referenced = _referenced(db, batch)
+        for path in batch:
+            if path not in referenced:
+                yield path
+
+def find_missing(db):
+    """
+    Yield (note_id, file_path) for notes whose attachment is gone.
+    """
+    for note_id, path in db.execute("SELECT id, file_path FROM notes WHERE file_path IS NOT NULL AND file_path != '' "
+                                    "AND file_path NOT LIKE 's3://%' UNION "
+                                    "SELECT note_id, file_path FROM attachments WHERE file_path NOT LIKE 's3://%'"):
+        if not os.path.exists(path):
+            yield note_id, path
+
+def collect_garbage(mode="quarantine", batch_size=500, grace_seconds=300):
+    """
+    Move (mode="quarantine") or delete (mode="delete") orphan files.
+    Returns a summary dict.
+    """
+    db = _connect()
+    orphans = list(find_orphans(db, batch_size, grace_seconds))
+    if mode == "quarantine" and orphans:
+        os.makedirs(QUARANTINE_DIR, exist_ok=True)
+    for path in orphans:
+        if mode == "delete":
+            os.remove(path)
+        else:
+            shutil.move(path, os.path.join(QUARANTINE_DIR, os.path.basename(path)))
+    db.executemany("DELETE FROM file_checksums WHERE file_path=?", [(p,) for p in orphans])
+    missing = list(find_missing(db))
+    for _, path in missing:
+        db.execute("INSERT OR REPLACE INTO file_checksums (file_path, sha256, size, verified_at, status) "
+                   "VALUES (?, COALESCE((SELECT sha256 FROM file_checksums WHERE file_path=?), ''), 0, ?, 'missing')",
+                   (path, path, _now()))
+    db.commit()
+    db.close()
+    return {"orphans": len(orphans), "mode": mode, "missing": missing}
+
+# ------------------- Checksum Scrub -------------------
+def scrub(bytes_per_sec=8 * 1024 * 1024, limit=None):
+    """
+    Verify attachment checksums, reading at most bytes_per_sec. Files seen
+    for the first time get their checksum recorded; mismatches are marked
+    'corrupt'. Least recently verified files go first so repeated short
+    runs cover everything.
+    """
+    db = _connect()
+    bucket = TokenBucket(bytes_per_sec)
+    rows = db.execute("""
+        SELECT n.file_path, f.sha256 FROM
+            (SELECT file_path FROM notes WHERE file_path IS NOT NULL AND file_path != '' AND file_path NOT LIKE 's3://%'
+             UNION SELECT file_path FROM attachments WHERE file_path NOT LIKE 's3://%') n
+        LEFT JOIN file_checksums f ON f.file_path = n.file_path
+        ORDER BY f.verified_at IS NOT NULL, f.verified_at
+    """).fetchall()
+    result = {"checked": 0, "recorded": 0, "corrupt": [], "missing": 0}
+    for path, expected in rows[:limit]:
+        if not os.path.exists(path):
+            result["missing"] += 1
+            continue
+        actual = file_sha256(path, bucket)
+        status = "ok"
+        if not expected:
+            result["recorded"] += 1
+        elif actual != expected:
+            status = "corrupt"
+            result["corrupt"].append(path)
+        db.execute("INSERT OR REPLACE INTO file_checksums (file_path, sha256, size, verified_at, status) VALUES (?, ?, ?, ?, ?)",
+                   (path, expected or actual, os.path.getsize(path), _now(), status))
+        db.commit()
+        result["checked"] += 1
+    db.close()
+    return result
+
+# ------------------- Daemon -------------------
+class MaintenanceDaemon(threading.Thread):
+    """
+    Background thread that runs garbage collection, a throttled scrub and
+    change-feed pruning every `interval` seconds.
+    """
+    def __init__(self, interval=3600, gc_mode="quarantine", bytes_per_sec=8 * 1024 * 1024):
+        super().__init__(name="campus-maintenance", daemon=True)
+        self.interval = interval
+        self.gc_mode = gc_mode
+        self.bytes_per_sec = bytes_per_sec
+        self.stop_event = threading.Event()
+        self.last_report = None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.last_report = {
+                "gc": collect_garbage(self.gc_mode),
+                "scrub": scrub(self.bytes_per_sec),
+                "changes_pruned": changes.prune(),
+                "finished_at": _now(),
+            }
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+if __name__ == "__main__":
+    # python maintenance.py gc [delete] | scrub [MB/s] | prune-changes [days]
+    if len(sys.argv) >= 2 and sys.argv[1] == "gc":
+        print(collect_garbage(sys.argv[2] if len(sys.argv) > 2 else "quarantine"))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "scrub":
+        rate = float(sys.argv[2]) if len(sys.argv) > 2 else 8
+        print(scrub(int(rate * 1024 * 1024)))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "prune-changes":
+        print(changes.prune(float(sys.argv[2]) if len(sys.argv) > 2 else changes.KEEP_DAYS))
+    else:
+        print("usage: python maintenance.py gc [delete] | scrub [MB/s] | prune-changes [days]")
@@ -0,0 +1,129 @@
+import os, math, time, atexit, threading
+from collections import Counter
+from auth import KIOSK, conn, c
+from writer import get_writer
+
+# ------------------- Popularity -------------------
+# Views and downloads are counted in memory and flushed to note_stats in one
+# batch every FLUSH_SECONDS, so reading a note never costs a write
+# transaction of its own.
+#
+# Trending uses forward decay: an event at time t adds exp(DECAY * (t - epoch))
+# to trend_score. Ordering by that stored value is the same as ordering by an
+# exponentially decayed count, so nothing has to be recomputed when time
+# passes; each flush only adds the new events. When the weights grow too
+# large the epoch is moved forward and all scores are rescaled once.
+
+HALF_LIFE_HOURS = float(os.environ.get("CAMPUS_TRENDING_HALF_LIFE_HOURS", "72"))
+FLUSH_SECONDS = float(os.environ.get("CAMPUS_STATS_FLUSH_SECONDS", "10"))
+DECAY = math.log(2) / (HALF_LIFE_HOURS * 3600)
+MAX_WEIGHT = 1e100
+
+c.execute('''CREATE TABLE IF NOT EXISTS note_stats (
+                note_id INTEGER PRIMARY KEY,
+                views INTEGER NOT NULL DEFAULT 0,
+                downloads INTEGER NOT NULL DEFAULT 0,
+                trend_score REAL NOT NULL DEFAULT 0
+            )''')
+c.execute("CREATE INDEX IF NOT EXISTS idx_note_stats_trend ON note_stats (trend_score DESC)")
+c.execute("CREATE TABLE IF NOT EXISTS note_stats_meta (key TEXT PRIMARY KEY, value REAL)")
+c.execute("INSERT OR IGNORE INTO note_stats_meta (key, value) VALUES ('epoch', ?)", (time.time(),))
+conn.commit()
+
+_lock = threading.Lock()
+_views = Counter()
+_downloads = Counter()
+_epoch = c.execute("SELECT value FROM note_stats_meta WHERE key='epoch'").fetchone()[0]
+
+def record_view(note_id, n=1):
+    with _lock:
+        _views[note_id] += n
+
+def record_download(note_id, n=1):
+    with _lock:
+        _downloads[note_id] += n
+
+def _rebase(writer, now):
+    """
+    Move the epoch to now and shrink every stored score by the same factor.
+    """
+    global _epoch
+    factor = math.exp(-DECAY * (now - _epoch))
+    writer.submit("UPDATE note_stats SET trend_score = trend_score * ?", (factor,))
+    writer.submit("UPDATE note_stats_meta SET value=? WHERE key='epoch'", (now,))
+    _epoch = now
+
+def flush():
+    """
+    Write buffered counters in one batch. Returns the number of notes touched.
+    """
+    with _lock:
+        views, downloads = _views.copy(), _downloads.copy()
+        _views.clear()
+        _downloads.clear()
+    note_ids = set(views) | set(downloads)
+    if not note_ids or KIOSK:
+        return 0
+    writer = get_writer()
+    now = time.time()
+    if DECAY * (now - _epoch) > math.log(MAX_WEIGHT):
+        _rebase(writer, now)
+    weight = math.exp(DECAY * (now - _epoch))
+    futures = []
+    for note_id in note_ids:
+        events = views[note_id] + downloads[note_id]
+        futures.append(writer.submit(
+            """INSERT INTO note_stats (note_id, views, downloads, trend_score) VALUES (?, ?, ?, ?)
+               ON CONFLICT(note_id) DO UPDATE SET views = views + excluded.views,
+                                                  downloads = downloads + excluded.downloads,
+                                                  trend_score = trend_score + excluded.trend_score""",
+            (note_id, views[note_id], downloads[note_id], events * weight)))
+    for f in futures:
+        f.result()
+    return len(note_ids)
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception:
+            pass   # keep counting; the next flush retries with new events only
+
+threading.Thread(target=_flush_loop, name="campus-stats-flush", daemon=True).start()
+atexit.register(flush)
+
+def decayed_score(trend_score, now=None):
+    """
+    Convert a stored score to "events, decayed to now" for display.
+    """
+    return trend_score * math.exp(-DECAY * ((now or time.time()) - _epoch))
+
+def trending(limit=20):
+    """
+    Top notes by decayed popularity, as search_notes-style rows.
+    """
+    c.execute("""
+        SELECT notes.id, notes.subject, notes.topic, notes.content, notes.timestamp, notes.file_path
+        FROM note_stats JOIN notes ON notes.id = note_stats.note_id
+        ORDER BY note_stats.trend_score DESC
+        LIMIT ?
+    """, (limit,))
+    return c.fetchall()
+
+def stats_for(note_ids):
+    """
+    Map note id -> (views, downloads), including events not yet flushed.
+    """
+    out = {}
+    if note_ids:
+        marks = ",".join("?" * len(note_ids))
+        for note_id, v, d in c.execute(f"SELECT note_id, views, downloads FROM note_stats WHERE note_id IN ({marks})",
+                                       list(note_ids)):
+            out[note_id] = (v, d)
+    with _lock:
+        for note_id in note_ids:
+            v, d = out.get(note_id, (0, 0))
+            if _views[note_id] or _downloads[note_id]:
+                out[note_id] = (v + _views[note_id], d + _downloads[note_id])
+    return out
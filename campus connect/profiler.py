@@ -0,0 +1,116 @@
+import os, json, time, atexit, functools, threading
+import tkinter as tk
+
+# ------------------- UI Profiler -------------------
+# Opt-in: set CAMPUS_PROFILE=profile.json. Records Tk event-loop lag from a
+# periodic after() heartbeat, the duration of every timed screen build and
+# callback, and live widget counts per window. The output is Chrome trace
+# format, so it opens in chrome://tracing or ui.perfetto.dev.
+
+OUTPUT = os.environ.get("CAMPUS_PROFILE")
+HEARTBEAT_MS = int(os.environ.get("CAMPUS_PROFILE_HEARTBEAT_MS", "50"))
+
+_events = []
+_lock = threading.Lock()
+_start = time.perf_counter()
+_pid = os.getpid()
+
+def enabled():
+    return bool(OUTPUT)
+
+def _now_us():
+    return (time.perf_counter() - _start) * 1e6
+
+def _add(event):
+    event.setdefault("pid", _pid)
+    event.setdefault("tid", threading.get_ident())
+    with _lock:
+        _events.append(event)
+
+def timed(name):
+    """
+    Decorator recording each call of the wrapped function as a trace span.
+    Free when profiling is off.
+    """
+    def decorate(func):
+        if not enabled():
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            begin = _now_us()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _add({"name": name, "cat": "ui", "ph": "X", "ts": begin, "dur": _now_us() - begin})
+        return wrapper
+    return decorate
+
+def wrap(name, func):
+    """
+    timed() for callbacks defined inline, e.g. command=profiler.wrap("search", perform_search).
+    """
+    return timed(name)(func)
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+def _sample_widgets(root):
+    windows = [w for w in root.winfo_children() if isinstance(w, tk.Toplevel)]
+    counts = {"main": count_widgets(root) - sum(count_widgets(w) for w in windows)}
+    for w in windows:
+        title = w.title() or w.winfo_name()
+        counts[title] = counts.get(title, 0) + count_widgets(w)
+    _add({"name": "widgets", "ph": "C", "ts": _now_us(), "args": counts})
+
+def start(root):
+    """
+    Start the heartbeat on a Tk root and register the trace to be written at exit.
+    """
+    if not enabled():
+        return
+    interval = HEARTBEAT_MS / 1000
+    state = {"expected": time.perf_counter() + interval, "beats": 0}
+
+    def beat():
+        now = time.perf_counter()
+        lag_ms = max(now - state["expected"], 0) * 1000
+        _add({"name": "event_loop_lag_ms", "ph": "C", "ts": _now_us(), "args": {"lag": round(lag_ms, 3)}})
+        state["beats"] += 1
+        if state["beats"] % 20 == 0:
+            _sample_widgets(root)
+        state["expected"] = time.perf_counter() + interval
+        root.after(HEARTBEAT_MS, beat)
+
+    root.after(HEARTBEAT_MS, beat)
+    atexit.register(dump)
+
+def summary():
+    """
+    Per-span count / total / max in milliseconds plus lag percentiles.
+    """
+    with _lock:
+        events = list(_events)
+    spans = {}
+    for e in events:
+        if e["ph"] == "X":
+            s = spans.setdefault(e["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += 1
+            s["total_ms"] += e["dur"] / 1000
+            s["max_ms"] = max(s["max_ms"], e["dur"] / 1000)
+    lags = sorted(e["args"]["lag"] for e in events if e["name"] == "event_loop_lag_ms")
+    lag = {}
+    if lags:
+        for p in (50, 95, 99):
+            lag[f"p{p}_ms"] = lags[min(len(lags) - 1, int(len(lags) * p / 100))]
+        lag["max_ms"] = lags[-1]
+    return {"spans": spans, "event_loop_lag": lag}
+
+def dump(path=None):
+    path = path or OUTPUT
+    if not path:
+        return
+    with _lock:
+        events = list(_events)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "summary": summary()}, f)
@@ -0,0 +1,54 @@
+import os
+from auth import conn, c
+import attachments  # creates attachments
+
+# ------------------- Storage Quotas -------------------
+# Usage is kept per user in user_usage and bumped in the same write batch as
+# the note itself, so checking a quota is a single primary-key lookup.
+
+QUOTA_BYTES = int(os.environ.get("CAMPUS_QUOTA_MB", "500")) * 1024 * 1024
+QUOTA_FILES = int(os.environ.get("CAMPUS_QUOTA_FILES", "2000"))
+
+c.execute('''CREATE TABLE IF NOT EXISTS user_usage (
+                user_id INTEGER PRIMARY KEY,
+                bytes_used INTEGER NOT NULL DEFAULT 0,
+                files INTEGER NOT NULL DEFAULT 0
+            )''')
+conn.commit()
+
+ADD_USAGE_SQL = '''INSERT INTO user_usage (user_id, bytes_used, files) VALUES (?, ?, ?)
+                   ON CONFLICT(user_id) DO UPDATE SET bytes_used = bytes_used + excluded.bytes_used,
+                                                      files = files + excluded.files'''
+
+def usage(user_id, db=None):
+    db = db or c
+    row = db.execute("SELECT bytes_used, files FROM user_usage WHERE user_id=?", (user_id,)).fetchone()
+    return row or (0, 0)
+
+def check_quota(user_id, incoming_bytes, db=None, files=1):
+    """
+    Return None if the upload fits, otherwise a message explaining why not.
+    """
+    used, count = usage(user_id, db)
+    if count + files > QUOTA_FILES:
+        return f"File quota reached ({QUOTA_FILES} files)."
+    if used + incoming_bytes > QUOTA_BYTES:
+        left = max(QUOTA_BYTES - used, 0) // (1024 * 1024)
+        return f"Storage quota exceeded: {left} MB left of {QUOTA_BYTES // (1024 * 1024)} MB."
+    return None
+
+def rebuild_usage():
+    """
+    Recompute every user's usage from notes (e.g. after a migration).
+    """
+    c.execute("DELETE FROM user_usage")
+    rows = c.execute("SELECT notes.user_id, attachments.file_path FROM attachments "
+                     "JOIN notes ON notes.id = attachments.note_id").fetchall()
+    totals = {}
+    for user_id, path in rows:
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        used, files = totals.get(user_id, (0, 0))
+        totals[user_id] = (used + size, files + 1)
+    c.executemany("INSERT INTO user_usage (user_id, bytes_used, files) VALUES (?, ?, ?)",
+                  [(u, b, f) for u, (b, f) in totals.items()])
+    conn.commit()
@@ -0,0 +1,71 @@
+import os, time, threading
+
+# ------------------- Token Bucket -------------------
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens are added per second up to
+    `capacity`. consume() either waits for enough tokens or reports
+    whether they were available.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, amount=1):
+        with self.lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+    def consume(self, amount=1):
+        """
+        Block until `amount` tokens have been taken. Amounts larger than the
+        capacity are allowed; the bucket simply goes into debt.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+# ------------------- Per-user Limits -------------------
+# (tokens per second, burst). Override with e.g. CAMPUS_RATE_UPLOAD=0.2:10
+DEFAULT_LIMITS = {
+    "upload": (0.2, 10),
+    "search": (5, 20),
+    "doubt": (0.1, 5),
+}
+
+def _limit(action):
+    value = os.environ.get(f"CAMPUS_RATE_{action.upper()}")
+    if value:
+        rate, _, burst = value.partition(":")
+        return float(rate), float(burst or rate)
+    return DEFAULT_LIMITS[action]
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def allow(action, user_id):
+    """
+    Take one token from the user's bucket for `action`. Returns False when
+    the user is over their rate; callers report the error themselves.
+    """
+    key = (action, user_id)
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            rate, burst = _limit(action)
+            bucket = _buckets[key] = TokenBucket(rate, burst)
+    return bucket.try_consume()
@@ -0,0 +1,233 @@
+import os, sys, time, uuid, hashlib, sqlite3, threading
+from auth import DB_PATH, conn, c
+from writer import get_writer
+import quota
+import tags
+import upload
+
+# ------------------- Resumable Uploads -------------------
+# Remote clients send big attachments in fixed-size chunks:
+#
+#   1. open_session()   -> session id, chunk size, chunk count
+#   2. put_chunk()      one chunk at a time, any order, in parallel, with
+#                       the chunk's sha256; a bad or short chunk is refused
+#   3. missing_chunks() which chunks still have to be (re)sent after a drop
+#   4. complete()       checks every chunk arrived, verifies the whole-file
+#                       sha256 and creates the note through upload.create_note
+#
+# Chunks are written straight into a preallocated file in PARTIAL_DIR at
+# their offset, so nothing is held in memory and completing is a rename.
+# Sessions not touched for SESSION_TTL_HOURS are expired with their file.
+# A completed session keeps its note id until it expires, so a client that
+# retries complete() (say after a dropped response) gets the same note
+# instead of a second one.
+# Every function takes an optional db connection so HTTP request threads
+# can use their own; writes go through the write queue.
+
+PARTIAL_DIR = "uploads_partial"
+CHUNK_SIZE = int(os.environ.get("CAMPUS_UPLOAD_CHUNK_MB", "4")) * 1024 * 1024
+MAX_FILE_SIZE = int(os.environ.get("CAMPUS_UPLOAD_MAX_MB", "2048")) * 1024 * 1024
+SESSION_TTL_HOURS = float(os.environ.get("CAMPUS_UPLOAD_TTL_HOURS", "24"))
+
+c.execute('''CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER,
+                filename TEXT,
+                size INTEGER,
+                sha256 TEXT,
+                chunk_size INTEGER,
+                subject TEXT,
+                topic TEXT,
+                content TEXT,
+                tags TEXT,
+                updated_at INTEGER,
+                note_id INTEGER
+            )''')
+if "note_id" not in [row[1] for row in c.execute("PRAGMA table_info(upload_sessions)")]:
+    c.execute("ALTER TABLE upload_sessions ADD COLUMN note_id INTEGER")
+c.execute('''CREATE TABLE IF NOT EXISTS upload_chunks (
+                session_id TEXT,
+                idx INTEGER,
+                sha256 TEXT,
+                PRIMARY KEY (session_id, idx)
+            )''')
+conn.commit()
+
+class UploadError(Exception):
+    """
+    A request that cannot be accepted; status is the HTTP status to report.
+    """
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+_complete_locks = {}
+_complete_locks_lock = threading.Lock()
+
+def _partial_path(session_id):
+    return os.path.join(PARTIAL_DIR, session_id + ".part")
+
+def _chunk_count(size, chunk_size):
+    return max((size + chunk_size - 1) // chunk_size, 1)
+
+def _session(session_id, user_id, db, completed_ok=False):
+    row = db.execute("SELECT user_id, filename, size, sha256, chunk_size, subject, topic, content, tags, note_id "
+                     "FROM upload_sessions WHERE id=?", (session_id,)).fetchone()
+    if row is None or row[0] != user_id:
+        raise UploadError("Unknown or expired upload session", 404)
+    if row[9] is not None and not completed_ok:
+        raise UploadError("Upload already completed", 409)
+    return row
+
+def open_session(user_id, filename, size, sha256, subject, topic, content="", tag_names=None, db=None):
+    """
+    Start an upload. Returns {"id", "chunk_size", "chunks"}. Counts
+    against the user's upload rate limit like every other upload path.
+    """
+    db = db or c
+    filename = os.path.basename(filename or "")
+    if not filename or not subject or not topic:
+        raise UploadError("filename, subject and topic are required")
+    if not isinstance(size, int) or size < 0 or size > MAX_FILE_SIZE:
+        raise UploadError(f"size must be between 0 and {MAX_FILE_SIZE} bytes")
+    if not sha256 or len(sha256) != 64:
+        raise UploadError("sha256 of the whole file is required")
+    if isinstance(tag_names, str):
+        tag_names = tags.parse_tags(tag_names)
+    error = upload.check_upload(user_id)
+    if error:
+        raise UploadError(error, 429)
+    error = quota.check_quota(user_id, size, db)
+    if error:
+        raise UploadError(error, 413)
+
+    session_id = uuid.uuid4().hex
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    with open(_partial_path(session_id), "wb") as f:
+        f.truncate(size)
+    get_writer().execute("INSERT INTO upload_sessions (id, user_id, filename, size, sha256, chunk_size, subject, topic, "
+                         "content, tags, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (session_id, user_id, filename, size, sha256.lower(), CHUNK_SIZE, subject, topic, content,
+                          " ".join(tag_names or []), int(time.time())))
+    return {"id": session_id, "chunk_size": CHUNK_SIZE, "chunks": _chunk_count(size, CHUNK_SIZE)}
+
+def put_chunk(session_id, user_id, index, data, sha256, db=None):
+    """
+    Store chunk `index` after checking its length and hash. Sending the
+    same chunk twice is harmless.
+    """
+    db = db or c
+    _, _, size, _, chunk_size, *_ = _session(session_id, user_id, db)
+    if not 0 <= index < _chunk_count(size, chunk_size):
+        raise UploadError("chunk index out of range")
+    expected = min(chunk_size, size - index * chunk_size)
+    if len(data) != expected:
+        raise UploadError(f"chunk {index} must be {expected} bytes, got {len(data)}")
+    actual = hashlib.sha256(data).hexdigest()
+    if actual != (sha256 or "").lower():
+        raise UploadError(f"chunk {index} hash mismatch", 422)
+    fd = os.open(_partial_path(session_id), os.O_WRONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if hasattr(os, "pwrite"):
+            os.pwrite(fd, data, index * chunk_size)
+        else:
+            os.lseek(fd, index * chunk_size, os.SEEK_SET)
+            os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    writer = get_writer()
+    writer.submit("INSERT OR REPLACE INTO upload_chunks (session_id, idx, sha256) VALUES (?, ?, ?)", (session_id, index, actual))
+    writer.execute("UPDATE upload_sessions SET updated_at=? WHERE id=?", (int(time.time()), session_id))
+
+def missing_chunks(session_id, user_id, db=None):
+    """
+    Returns {"chunks": total, "received": n, "missing": [indexes]}.
+    """
+    db = db or c
+    _, _, size, _, chunk_size, *_ = _session(session_id, user_id, db)
+    total = _chunk_count(size, chunk_size)
+    have = {row[0] for row in db.execute("SELECT idx FROM upload_chunks WHERE session_id=?", (session_id,))}
+    return {"chunks": total, "received": len(have), "missing": [i for i in range(total) if i not in have]}
+
+def complete(session_id, user_id, db=None):
+    """
+    Verify the assembled file and turn it into a note. Returns the note id.
+    Calls for one session run one at a time, and once it has completed
+    they return the same note id.
+    """
+    db = db or c
+    with _complete_locks_lock:
+        lock = _complete_locks.setdefault(session_id, threading.Lock())
+    with lock:
+        try:
+            return _complete(session_id, user_id, db)
+        finally:
+            with _complete_locks_lock:
+                _complete_locks.pop(session_id, None)
+
+def _complete(session_id, user_id, db):
+    _, filename, size, sha256, _, subject, topic, content, tag_text, note_id = _session(session_id, user_id, db,
+                                                                                        completed_ok=True)
+    if note_id is not None:
+        return note_id
+    status = missing_chunks(session_id, user_id, db)
+    if status["missing"]:
+        raise UploadError(f"{len(status['missing'])} chunks missing", 409)
+    path = _partial_path(session_id)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    if h.hexdigest() != sha256:
+        # Every chunk matched its own hash, so the client's chunk list or
+        # file hash is wrong; make it start over.
+        discard(session_id)
+        raise UploadError("file hash mismatch; upload discarded", 422)
+
+    dest = upload.reserve_dest(filename, time.strftime('%Y%m%d%H%M%S'))
+    os.replace(path, dest)
+    try:
+        note_id = upload.create_note(user_id, subject, topic, content, dest, tags.parse_tags(tag_text), digest=sha256)
+    except Exception:
+        if os.path.exists(dest):
+            os.replace(dest, path)   # keep the session so the client can retry complete
+        raise
+    writer = get_writer()
+    writer.submit("DELETE FROM upload_chunks WHERE session_id=?", (session_id,))
+    writer.execute("UPDATE upload_sessions SET note_id=?, updated_at=? WHERE id=?", (note_id, int(time.time()), session_id))
+    return note_id
+
+def _forget(session_id):
+    writer = get_writer()
+    writer.submit("DELETE FROM upload_chunks WHERE session_id=?", (session_id,))
+    writer.execute("DELETE FROM upload_sessions WHERE id=?", (session_id,))
+
+def discard(session_id):
+    path = _partial_path(session_id)
+    if os.path.exists(path):
+        os.remove(path)
+    _forget(session_id)
+
+def expire_sessions(ttl_hours=SESSION_TTL_HOURS, db=None):
+    """
+    Drop sessions idle for longer than ttl_hours. Returns how many.
+    """
+    own = db is None
+    db = db or sqlite3.connect(DB_PATH, timeout=30)
+    cutoff = int(time.time() - ttl_hours * 3600)
+    stale = [row[0] for row in db.execute("SELECT id FROM upload_sessions WHERE updated_at < ?", (cutoff,))]
+    if own:
+        db.close()
+    for session_id in stale:
+        discard(session_id)
+    return len(stale)
+
+
+if __name__ == "__main__":
+    # python resumable.py expire [hours]
+    if len(sys.argv) >= 2 and sys.argv[1] == "expire":
+        print(expire_sessions(float(sys.argv[2]) if len(sys.argv) > 2 else SESSION_TTL_HOURS))
+    else:
+        print("usage: python resumable.py expire [hours]")
@@ -0,0 +1,125 @@
+import os, re, sys, uuid, hashlib, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+# ------------------- Local S3 Stand-in -------------------
+# Just enough of the S3 API for storage.S3Backend: PUT/GET/HEAD/DELETE
+# object, Range GETs and multipart upload. Objects are files under ROOT.
+# Signatures are not checked. For development and testing only.
+#
+#   python s3_local.py 9000 /tmp/s3data
+#   CAMPUS_STORAGE=s3 CAMPUS_S3_ENDPOINT=http://127.0.0.1:9000 CAMPUS_S3_BUCKET=notes python main_app.py
+
+class S3StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    root = "s3data"
+    uploads = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _target(self):
+        url = urlparse(self.path)
+        self.query = parse_qs(url.query, keep_blank_values=True)
+        path = unquote(url.path).lstrip("/")
+        return os.path.join(self.root, *path.split("/"))
+
+    def _reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_PUT(self):
+        target = self._target()
+        data = self._body()
+        if "uploadId" in self.query:
+            upload_id = self.query["uploadId"][0]
+            with self.lock:
+                if upload_id not in self.uploads:
+                    return self._reply(404)
+                self.uploads[upload_id][int(self.query["partNumber"][0])] = data
+            return self._reply(200, headers={"ETag": '"%s"' % hashlib.md5(data).hexdigest()})
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        self._reply(200, headers={"ETag": '"%s"' % hashlib.md5(data).hexdigest()})
+
+    def do_POST(self):
+        target = self._target()
+        body = self._body()
+        if "uploads" in self.query:
+            upload_id = uuid.uuid4().hex
+            with self.lock:
+                self.uploads[upload_id] = {}
+            xml = f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            return self._reply(200, xml.encode(), {"Content-Type": "application/xml"})
+        if "uploadId" in self.query:
+            with self.lock:
+                parts = self.uploads.pop(self.query["uploadId"][0], None)
+            if parts is None:
+                return self._reply(404)
+            order = [int(n) for n in re.findall(rb"<PartNumber>(\d+)</PartNumber>", body)]
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                for n in order:
+                    f.write(parts[n])
+            return self._reply(200, b"<CompleteMultipartUploadResult/>", {"Content-Type": "application/xml"})
+        self._reply(400)
+
+    def do_GET(self):
+        target = self._target()
+        if not os.path.isfile(target):
+            return self._reply(404)
+        size = os.path.getsize(target)
+        m = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        with open(target, "rb") as f:
+            if m:
+                start = int(m.group(1))
+                end = min(int(m.group(2)) if m.group(2) else size - 1, size - 1)
+                f.seek(start)
+                return self._reply(206, f.read(end - start + 1), {"Content-Range": f"bytes {start}-{end}/{size}"})
+            self._reply(200, f.read())
+
+    def do_HEAD(self):
+        target = self._target()
+        if not os.path.isfile(target):
+            return self._reply(404)
+        self.send_response(200)
+        self.send_header("Content-Length", str(os.path.getsize(target)))
+        self.end_headers()
+
+    def do_DELETE(self):
+        target = self._target()
+        if "uploadId" in self.query:
+            with self.lock:
+                self.uploads.pop(self.query["uploadId"][0], None)
+        elif os.path.isfile(target):
+            os.remove(target)
+        self._reply(204)
+
+
+def start(port=0, root="s3data"):
+    """
+    Start the stand-in on a background thread and return the server;
+    server.server_port gives the bound port.
+    """
+    handler = type("Handler", (S3StandInHandler,), {"root": root, "uploads": {}})
+    httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 9000
+    root = sys.argv[2] if len(sys.argv) > 2 else "s3data"
+    S3StandInHandler.root = root
+    print(f"S3 stand-in on http://127.0.0.1:{port} storing under {root}")
+    ThreadingHTTPServer(("127.0.0.1", port), S3StandInHandler).serve_forever()
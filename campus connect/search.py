@@ -3,26 +3,177 @@ import subprocess
 import sys
 from tkinter import messagebox
 from auth import c
+import shards
+import ratelimit
+import json
+import tags
+import popularity  # creates note_stats
+import heapq
+import archive
+import storage
+import datetime
+import autocomplete
+import subjects
 
 # ------------------- Search Notes -------------------
-def search_notes(keyword):
+def _epoch(value, end_of_day=False):
+    """
+    Accept epoch seconds, a datetime/date or a "YYYY-MM-DD" string.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.datetime.strptime(value.strip(), "%Y-%m-%d")
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if end_of_day and (value.hour, value.minute, value.second) == (0, 0, 0):
+        value += datetime.timedelta(days=1, seconds=-1)
+    return int(value.timestamp())
+
+def _stamp(epoch):
+    """
+    Epoch seconds -> the "YYYY-MM-DD HH:MM:SS" text kept in timestamp columns.
+    """
+    return datetime.datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S") if epoch is not None else None
+
+def search_notes(keyword, user_id=None, tag_query=None, sort="recent", include_archive=False,
+                 subject=None, since=None, until=None, uploader=None):
     """
     Search notes based on keyword in Topic, Subject, Content, or attached file name.
-    Returns a list of matching notes.
+    Returns a list of matching notes. When user_id is given the search
+    counts against that user's rate limit. tag_query (e.g. "midterm -solved")
+    narrows the result using the in-memory tag index. sort="trending"
+    orders by decayed view/download popularity instead of date.
+    include_archive also searches the cold archive with the same filters
+    (archived tags are matched from the text kept with each note; archived
+    notes have no trending score, so they come last when sorting by it).
+    subject (any known spelling or alias), since/until (inclusive dates)
+    and uploader (username) filter on integer keys served by the composite
+    created_at indexes. With sharding on, the same filters run in the
+    shard queries.
     """
-    c.execute("""
+    if user_id is not None and not ratelimit.allow("search", user_id):
+        messagebox.showerror("Error", "Too many searches. Please slow down.")
+        return []
+    if user_id is not None and keyword:
+        autocomplete.record_query(keyword)
+    included, excluded = tags.index.query(tag_query) if tag_query else (None, [])
+    if included is not None and not included and not include_archive:
+        return []
+    subject_id = uploader_id = None
+    if subject:
+        subject_id, subject = subjects.resolve(subject, create=False)
+        if subject_id is None:
+            return []
+    if uploader:
+        row = c.execute("SELECT id FROM users WHERE username = ?", (uploader.strip(),)).fetchone()
+        if row is None:
+            return []
+        uploader_id = row[0]
+    since, until = _epoch(since), _epoch(until, end_of_day=True)
+    if shards.enabled():
+        results = _search_shards(keyword, subject, uploader_id, since, until, included, excluded, sort)
+    else:
+        results = _search_main(keyword, subject_id, uploader_id, since, until, included, excluded, sort)
+    if include_archive and archive.attach_archive(c):
+        archived = _search_archive(keyword, subject_id, uploader_id, since, until, tag_query)
+        if sort == "trending":
+            results += archived
+        else:
+            results = list(heapq.merge(results, archived, key=lambda row: row[4] or "", reverse=True))
+    return results
+
+def _search_main(keyword, subject_id, uploader_id, since, until, included, excluded, sort):
+    sql = """
         SELECT id, subject, topic, content, timestamp, file_path
         FROM notes
-        WHERE topic LIKE ? OR subject LIKE ? OR content LIKE ? OR file_path LIKE ?
-        ORDER BY timestamp DESC
-    """, ('%'+keyword+'%', '%'+keyword+'%', '%'+keyword+'%', '%'+keyword+'%'))
+        LEFT JOIN note_stats ON note_stats.note_id = notes.id
+        WHERE 1=1
+    """
+    params = []
+    if keyword:
+        sql += " AND (topic LIKE ? OR subject LIKE ? OR content LIKE ? OR file_path LIKE ?)"
+        params += ['%'+keyword+'%', '%'+keyword+'%', '%'+keyword+'%', '%'+keyword+'%']
+    if subject_id is not None:
+        sql += " AND subject_id = ?"
+        params.append(subject_id)
+    if uploader_id is not None:
+        sql += " AND user_id = ?"
+        params.append(uploader_id)
+    if since is not None:
+        sql += " AND created_at >= ?"
+        params.append(since)
+    if until is not None:
+        sql += " AND created_at <= ?"
+        params.append(until)
+    # Posting lists are passed as one JSON parameter so the id filter is a
+    # single primary-key lookup per tagged note rather than a join.
+    if included is not None:
+        sql += " AND id IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(included))
+    if excluded:
+        sql += " AND id NOT IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(excluded))
+    if sort == "trending":
+        sql += " ORDER BY COALESCE(note_stats.trend_score, 0) DESC, created_at DESC"
+    else:
+        sql += " ORDER BY created_at DESC"
+    c.execute(sql, params)
     return c.fetchall()
 
+def _search_archive(keyword, subject_id, uploader_id, since, until, tag_query):
+    sql = archive.ARCHIVE_NOTES_SELECT
+    params = ['%'+(keyword or '')+'%'] * 4
+    if subject_id is not None:
+        # Archived rows keep the subject text; any spelling of the subject matches.
+        sql += " AND lower(trim(subject)) IN (SELECT alias FROM subject_aliases WHERE subject_id = ?)"
+        params.append(subject_id)
+    if uploader_id is not None:
+        sql += " AND user_id = ?"
+        params.append(uploader_id)
+    if since is not None:
+        sql += " AND timestamp >= ?"
+        params.append(_stamp(since))
+    if until is not None:
+        sql += " AND timestamp <= ?"
+        params.append(_stamp(until))
+    c.execute(sql + " ORDER BY timestamp DESC", params)
+    rows = c.fetchall()
+    if tag_query:
+        rows = [row for row in rows if tags.matches(tag_query, (row[6] or "").split())]
+    return [row[:6] for row in rows]
+
+def _search_shards(keyword, subject, uploader_id, since, until, included, excluded, sort):
+    """
+    Same filters over the shard files. Shard rows carry ids allocated from
+    the main database, so tag postings and note_stats apply to them as well.
+    """
+    results = shards.search_notes(keyword, subject=subject, user_id=uploader_id, since=_stamp(since), until=_stamp(until))
+    if included is not None:
+        wanted = set(included)
+        results = [row for row in results if row[0] in wanted]
+    if excluded:
+        unwanted = set(excluded)
+        results = [row for row in results if row[0] not in unwanted]
+    if sort == "trending" and results:
+        scores = dict(c.execute("SELECT note_id, trend_score FROM note_stats WHERE note_id IN (SELECT value FROM json_each(?))",
+                                (json.dumps([row[0] for row in results]),)))
+        # Stable sort: equal scores stay newest first.
+        results.sort(key=lambda row: scores.get(row[0]) or 0, reverse=True)
+    return results
+
 # ------------------- Open Attached File -------------------
 def open_file(path: str):
     """
     Open attached PDF or image file.
     """
+    try:
+        path = storage.open_local(path)
+    except Exception as e:
+        messagebox.showerror("Error", f"Cannot fetch file: {e}")
+        return
     if not path or not os.path.exists(path):
         messagebox.showerror("Error", "File not found.")
         return
@@ -30,8 +181,8 @@ def open_file(path: str):
         if sys.platform.startswith('win'):
             os.startfile(path)
         elif sys.platform.startswith('darwin'):
-            subprocess.call(['open', path])
+            subprocess.Popen(['open', path])
         else:
-            subprocess.call(['xdg-open', path])
+            subprocess.Popen(['xdg-open', path])
     except Exception as e:
         messagebox.showerror("Error", f"Cannot open file: {e}")
@@ -0,0 +1,382 @@
+import os, re, sys, json, mmap, base64, sqlite3, threading, mimetypes, traceback
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from auth import DB_PATH, hash_password
+import changes
+import export
+import popularity
+import storage
+import resumable
+import subjects
+
+# ------------------- HTTP Service -------------------
+# Small HTTP API for remote clients. Each request thread gets its own SQLite
+# connection; the Tk app keeps using the shared one from auth.py. Every
+# route requires HTTP Basic auth with a Campus Connect account, since the
+# server listens on all interfaces by default.
+
+CHUNK_SIZE = 1024 * 1024
+_local = threading.local()
+
+def get_db():
+    if getattr(_local, "conn", None) is None:
+        _local.conn = sqlite3.connect(DB_PATH, timeout=30)
+    return _local.conn
+
+def file_etag(st):
+    """
+    Validator built from inode, size and mtime, so it changes
+    whenever the file is replaced or rewritten without hashing its bytes.
+    """
+    return '"%x-%x-%x"' % (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def parse_range(header, size):
+    """
+    Parse a single "bytes=" range. Returns (start, end) inclusive, None to
+    serve the whole file, or False if the range cannot be satisfied.
+    """
+    m = re.fullmatch(r"bytes=(\d*)-(\d*)", (header or "").strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None   # absent, malformed or multi-range: send the full body
+    if not m.group(1):
+        length = int(m.group(2))
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(m.group(1))
+    end = int(m.group(2)) if m.group(2) else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+class ChunkedWriter:
+    """
+    Minimal write-only file object that frames everything written to it as
+    HTTP/1.1 chunks. Not seekable, so zipfile writes data descriptors.
+    """
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data):
+        if data:
+            self.wfile.write(b"%x\r\n" % len(data))
+            self.wfile.write(data)
+            self.wfile.write(b"\r\n")
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class CampusConnectHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    routes = [
+        ("GET", r"/attachments/(\d+)", "serve_attachment"),
+        ("GET", r"/attachments/(\d+)/(\d+)", "serve_attachment"),
+        ("GET", r"/changes", "serve_changes"),
+        ("GET", r"/export", "serve_export"),
+        ("POST", r"/uploads", "upload_open"),
+        ("GET", r"/uploads/([0-9a-f]{32})", "upload_status"),
+        ("PUT", r"/uploads/([0-9a-f]{32})/chunks/(\d+)", "upload_chunk"),
+        ("POST", r"/uploads/([0-9a-f]{32})/complete", "upload_complete"),
+    ]
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        for route_method, pattern, name in self.routes:
+            m = re.fullmatch(pattern, url.path)
+            if route_method == method and m:
+                return getattr(self, name)(*m.groups())
+        self.send_error(404)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_HEAD(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def read_body(self, limit):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > limit:
+            raise resumable.UploadError("request body too large", 413)
+        return self.rfile.read(length)
+
+    def authenticate(self):
+        """
+        HTTP Basic auth against the users table. Returns the user id, or
+        None after sending 401.
+        """
+        header = self.headers.get("Authorization", "")
+        if header.startswith("Basic "):
+            try:
+                username, _, password = base64.b64decode(header[6:]).decode().partition(":")
+            except ValueError:
+                username = password = None
+            if username:
+                row = get_db().execute("SELECT id FROM users WHERE username=? AND password=?",
+                                       (username, hash_password(password))).fetchone()
+                if row:
+                    return row[0]
+        self.send_response(401)
+        self.send_header("WWW-Authenticate", 'Basic realm="Campus Connect"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return None
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    # ------------------- Change Feed -------------------
+    def serve_changes(self):
+        """
+        GET /changes?since=N[&entity=note|doubt|answer][&wait=seconds]
+        With wait, the request is held open until a change arrives (long-poll).
+        """
+        if self.authenticate() is None:
+            return
+        try:
+            cursor = int(self.query.get("since", 0))
+            wait = min(float(self.query.get("wait", 0)), 60.0)
+        except ValueError:
+            self.send_error(400, "since must be an integer and wait a number of seconds")
+            return
+        entity = self.query.get("entity")
+        if wait > 0:
+            items, next_cursor = changes.wait_for_changes(cursor, entity, timeout=wait)
+        else:
+            items, next_cursor = changes.changes_since(cursor, entity, db=get_db())
+        # oldest > cursor + 1 means rows the client never saw were pruned.
+        self.send_json({"changes": items, "cursor": next_cursor, "oldest": changes.oldest_seq(get_db())})
+
+    # ------------------- Export -------------------
+    def serve_export(self):
+        """
+        GET /export?subject=S[&q=keyword]
+        Streams the matching notes as a ZIP with chunked transfer encoding;
+        the archive is produced while it is being sent.
+        """
+        if self.authenticate() is None:
+            return
+        subject = self.query.get("subject", "").strip()
+        keyword = self.query.get("q", "")
+        if not subject and not keyword:
+            self.send_error(400, "subject or q is required")
+            return
+        sql = "SELECT id, subject, topic, content, timestamp, file_path FROM notes WHERE 1=1"
+        params = []
+        if subject:
+            # Any spelling or alias of the subject, like search_notes.
+            subject_id, subject = subjects.resolve(subject, create=False)
+            if subject_id is None:
+                self.send_error(404, "Unknown subject")
+                return
+            sql += " AND subject_id = ?"
+            params.append(subject_id)
+        if keyword:
+            sql += " AND (topic LIKE ? OR subject LIKE ? OR content LIKE ?)"
+            params += ['%' + keyword + '%'] * 3
+        rows = get_db().execute(sql + " ORDER BY created_at DESC", params)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", f'attachment; filename="{export.export_filename(subject or keyword)}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        body = ChunkedWriter(self.wfile)
+        export.export_notes(rows, body, db=get_db())
+        body.close()
+
+    # ------------------- Resumable Uploads -------------------
+    def _upload_call(self, func):
+        user_id = self.authenticate()
+        if user_id is None:
+            return
+        try:
+            self.send_json(func(user_id))
+        except resumable.UploadError as e:
+            self.send_json({"error": str(e)}, e.status)
+        except Exception as e:
+            # The session is kept, so the client can retry the same call.
+            self.log_error("upload request failed: %r", e)
+            traceback.print_exc()
+            self.send_json({"error": "internal error"}, 500)
+
+    def upload_open(self):
+        """
+        POST /uploads  {"filename", "size", "sha256", "subject", "topic", "content", "tags"}
+        """
+        def run(user_id):
+            try:
+                spec = json.loads(self.read_body(64 * 1024) or b"{}")
+            except ValueError:
+                raise resumable.UploadError("body must be JSON")
+            return resumable.open_session(user_id, spec.get("filename"), spec.get("size"), spec.get("sha256"),
+                                          spec.get("subject"), spec.get("topic"), spec.get("content", ""),
+                                          spec.get("tags") or [], db=get_db())
+        self._upload_call(run)
+
+    def upload_status(self, session_id):
+        self._upload_call(lambda user_id: resumable.missing_chunks(session_id, user_id, db=get_db()))
+
+    def upload_chunk(self, session_id, index):
+        """
+        PUT /uploads/<id>/chunks/<n> with the chunk as body and its sha256
+        in X-Chunk-SHA256.
+        """
+        def run(user_id):
+            data = self.read_body(resumable.CHUNK_SIZE)
+            resumable.put_chunk(session_id, user_id, int(index), data, self.headers.get("X-Chunk-SHA256"), db=get_db())
+            return {"ok": True}
+        self._upload_call(run)
+
+    def upload_complete(self, session_id):
+        self._upload_call(lambda user_id: {"note_id": resumable.complete(session_id, user_id, db=get_db())})
+
+    # ------------------- Attachments -------------------
+    def serve_attachment(self, note_id, position="0"):
+        """
+        GET /attachments/<note id>[/<position>]: one file of a note, the
+        first one when no position is given.
+        """
+        if self.authenticate() is None:
+            return
+        db = get_db()
+        row = db.execute("SELECT file_path FROM attachments WHERE note_id=? AND position=?",
+                         (int(note_id), int(position))).fetchone()
+        if row is None and position == "0":
+            # Notes written by tools that do not record attachments (dbsync).
+            row = db.execute("SELECT file_path FROM notes WHERE id=?", (int(note_id),)).fetchone()
+        path = storage.open_local(row[0]) if row and row[0] else None
+        if not path or not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return
+        # Count a download once, not for every Range continuation or HEAD probe.
+        range_header = self.headers.get("Range", "")
+        if self.command == "GET" and (not range_header.startswith("bytes=") or range_header.startswith("bytes=0-")):
+            popularity.record_download(int(note_id))
+        self.send_file(path)
+
+    def send_file(self, path):
+        """
+        Serve a local file with conditional and Range support. The body is
+        sent with os.sendfile where the platform has it, otherwise from an
+        mmap, so the file is never read into a Python buffer in full.
+        """
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            etag = file_etag(st)
+            last_modified = formatdate(st.st_mtime, usegmt=True)
+
+            if self._not_modified(etag, st.st_mtime):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                return
+
+            size = st.st_size
+            byte_range = parse_range(self.headers.get("Range"), size)
+            if_range = self.headers.get("If-Range")
+            if byte_range and if_range and if_range != etag and if_range != last_modified:
+                byte_range = None
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = end - start + 1 if size else 0
+            self.send_response(206 if byte_range else 200)
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            if self.command == "HEAD" or length == 0:
+                return
+            self._send_body(f, start, length)
+
+    def _not_modified(self, etag, mtime):
+        inm = self.headers.get("If-None-Match")
+        if inm is not None:
+            return inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]
+        ims = self.headers.get("If-Modified-Since")
+        if ims:
+            try:
+                return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_body(self, f, offset, length):
+        if hasattr(os, "sendfile"):
+            first = offset
+            try:
+                out_fd = self.connection.fileno()
+                while length > 0:
+                    sent = os.sendfile(out_fd, f.fileno(), offset, min(length, CHUNK_SIZE))
+                    if sent == 0:
+                        break
+                    offset += sent
+                    length -= sent
+                return
+            except OSError:
+                # Only fall back to mmap if sendfile is unsupported for this
+                # socket; once bytes are on the wire the error is real.
+                if offset != first:
+                    raise
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                while length > 0:
+                    n = min(length, CHUNK_SIZE)
+                    self.wfile.write(view[offset:offset + n])
+                    offset += n
+                    length -= n
+            finally:
+                view.release()
+
+
+def _expire_loop(interval=600):
+    while True:
+        try:
+            resumable.expire_sessions()
+        except Exception:
+            pass
+        threading.Event().wait(interval)
+
+def run_server(host="0.0.0.0", port=8080):
+    threading.Thread(target=_expire_loop, name="campus-upload-expiry", daemon=True).start()
+    httpd = ThreadingHTTPServer((host, port), CampusConnectHandler)
+    print(f"Campus Connect API on http://{host}:{port}")
+    httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    run_server(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8080)
@@ -0,0 +1,280 @@
+import os, sys, glob, zlib, heapq, sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from auth import conn, c
+from writer import get_writer
+
+# Optional sharding of notes across several SQLite files.
+# Enable by setting CAMPUS_SHARDS to the number of shard files, e.g. CAMPUS_SHARDS=4.
+# The count is recorded in shard_meta on first use and read from there after
+# that, so it always matches where rows actually are; change it only with
+# `python shards.py rebalance N` (then restart running apps).
+# Rows are placed by a stable hash of the (normalized) subject, so every note of
+# one subject lives in the same shard.
+# Note ids are allocated from the main database's notes sequence, so a
+# sharded note never shares an id with another shard or with a note kept in
+# the main file, and tags, note_stats, history and attachments (all keyed by
+# note id in the main database) resolve to the right note.
+SHARD_DIR = "shards"
+SHARD_COUNT = int(os.environ.get("CAMPUS_SHARDS", "0") or 0)
+
+NOTES_SCHEMA = '''CREATE TABLE IF NOT EXISTS notes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                subject TEXT,
+                topic TEXT,
+                content TEXT,
+                timestamp TEXT,
+                file_path TEXT
+            )'''
+
+c.execute('''CREATE TABLE IF NOT EXISTS shard_note_ids (
+                id INTEGER PRIMARY KEY
+            )''')
+c.execute('''CREATE TABLE IF NOT EXISTS shard_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )''')
+_stored = c.execute("SELECT value FROM shard_meta WHERE key = 'shard_count'").fetchone()
+if _stored:
+    SHARD_COUNT = int(_stored[0])
+elif SHARD_COUNT:
+    c.execute("INSERT INTO shard_meta (key, value) VALUES ('shard_count', ?)", (str(SHARD_COUNT),))
+conn.commit()
+
+def set_shard_count(count):
+    global SHARD_COUNT
+    get_writer().execute("INSERT OR REPLACE INTO shard_meta (key, value) VALUES ('shard_count', ?)", (str(count),))
+    SHARD_COUNT = count
+
+def enabled():
+    return SHARD_COUNT > 0
+
+def shard_path(index):
+    return os.path.join(SHARD_DIR, f"notes_{index}.db")
+
+def shard_for(subject, count=None):
+    """
+    Return the shard index for a subject. Uses crc32 so the mapping is the
+    same across processes and Python versions.
+    """
+    count = count or SHARD_COUNT
+    key = (subject or "").strip().lower().encode()
+    return zlib.crc32(key) % count
+
+def connect_shard(index):
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    conn = sqlite3.connect(shard_path(index), timeout=30)
+    conn.execute(NOTES_SCHEMA)
+    return conn
+
+# ------------------- Write -------------------
+def allocate_id():
+    """
+    Reserve the next id of the main notes table's AUTOINCREMENT sequence.
+    """
+    rowids = get_writer().submit_group([
+        ("INSERT INTO sqlite_sequence (name, seq) SELECT 'notes', COALESCE((SELECT MAX(id) FROM notes), 0) "
+         "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'notes')", ()),
+        ("UPDATE sqlite_sequence SET seq = seq + 1 WHERE name = 'notes'", ()),
+        ("INSERT INTO shard_note_ids (id) SELECT seq FROM sqlite_sequence WHERE name = 'notes'", ()),
+    ]).result()
+    return rowids[-1]
+
+def insert_note(user_id, subject, topic, content, timestamp, file_path):
+    """
+    Insert a note into its subject's shard. Returns the note id.
+    """
+    note_id = allocate_id()
+    conn = connect_shard(shard_for(subject))
+    try:
+        conn.execute("INSERT INTO notes (id, user_id, subject, topic, content, timestamp, file_path) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (note_id, user_id, subject, topic, content, timestamp, file_path))
+        conn.commit()
+    finally:
+        conn.close()
+    return note_id
+
+# ------------------- Edit -------------------
+def find_note(note_id):
+    """
+    Return (shard index, (user_id, subject, topic, content, timestamp)) for
+    a sharded note, or (None, None) if no shard has it.
+    """
+    for index in existing_shards():
+        conn = connect_shard(index)
+        try:
+            row = conn.execute("SELECT user_id, subject, topic, content, timestamp FROM notes WHERE id=?", (note_id,)).fetchone()
+        finally:
+            conn.close()
+        if row:
+            return index, row
+    return None, None
+
+def update_note(note_id, subject, topic, content):
+    """
+    Replace a sharded note's subject/topic/content. If the new subject
+    hashes to another shard the row moves there and keeps its id; like
+    rebalance, the copy is committed before the old row is deleted.
+    Returns False if the note is in no shard.
+    """
+    index, _ = find_note(note_id)
+    if index is None:
+        return False
+    target = shard_for(subject)
+    src = connect_shard(index)
+    try:
+        if target == index:
+            src.execute("UPDATE notes SET subject=?, topic=?, content=? WHERE id=?", (subject, topic, content, note_id))
+            src.commit()
+            return True
+        user_id, timestamp, file_path = src.execute("SELECT user_id, timestamp, file_path FROM notes WHERE id=?",
+                                                    (note_id,)).fetchone()
+        dst = connect_shard(target)
+        try:
+            dst.execute("INSERT OR REPLACE INTO notes (id, user_id, subject, topic, content, timestamp, file_path) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", (note_id, user_id, subject, topic, content, timestamp, file_path))
+            dst.commit()
+        finally:
+            dst.close()
+        src.execute("DELETE FROM notes WHERE id=?", (note_id,))
+        src.commit()
+        return True
+    finally:
+        src.close()
+
+def rename_subject(old, new):
+    """
+    Refile every note of subject `old` under `new` (subjects.add_alias
+    merging two subjects), moving the rows to new's shard when it differs.
+    Returns the number of notes changed.
+    """
+    index, target = shard_for(old), shard_for(new)
+    src = connect_shard(index)
+    try:
+        key = (old or "").strip().lower()
+        if index == target:
+            changed = src.execute("UPDATE notes SET subject=? WHERE lower(trim(subject)) = ?", (new, key)).rowcount
+            src.commit()
+            return changed
+        rows = src.execute("SELECT id, user_id, topic, content, timestamp, file_path FROM notes WHERE lower(trim(subject)) = ?",
+                           (key,)).fetchall()
+        if not rows:
+            return 0
+        dst = connect_shard(target)
+        try:
+            dst.executemany("INSERT OR REPLACE INTO notes (id, user_id, subject, topic, content, timestamp, file_path) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", [(r[0], r[1], new) + tuple(r[2:]) for r in rows])
+            dst.commit()
+        finally:
+            dst.close()
+        src.executemany("DELETE FROM notes WHERE id=?", [(r[0],) for r in rows])
+        src.commit()
+        return len(rows)
+    finally:
+        src.close()
+
+# ------------------- Fan-out Search -------------------
+def _search_shard(index, keyword, subject=None, user_id=None, since=None, until=None):
+    sql = "SELECT id, subject, topic, content, timestamp, file_path FROM notes WHERE 1=1"
+    params = []
+    if keyword:
+        sql += " AND (topic LIKE ? OR subject LIKE ? OR content LIKE ? OR file_path LIKE ?)"
+        params += ['%' + keyword + '%'] * 4
+    if subject:
+        sql += " AND subject = ? COLLATE NOCASE"
+        params.append(subject)
+    if user_id is not None:
+        sql += " AND user_id = ?"
+        params.append(user_id)
+    if since:
+        sql += " AND timestamp >= ?"
+        params.append(since)
+    if until:
+        sql += " AND timestamp <= ?"
+        params.append(until)
+    conn = connect_shard(index)
+    try:
+        return conn.execute(sql + " ORDER BY timestamp DESC", params).fetchall()
+    finally:
+        conn.close()
+
+def search_notes(keyword, subject=None, user_id=None, since=None, until=None, max_workers=None):
+    """
+    Query every shard in parallel and k-way merge the per-shard results,
+    which are each already sorted by timestamp (newest first). A subject
+    filter only needs the one shard that subject hashes to; since/until
+    are "YYYY-MM-DD HH:MM:SS" timestamps.
+    """
+    indexes = [shard_for(subject)] if subject else range(SHARD_COUNT)
+    with ThreadPoolExecutor(max_workers=max_workers or SHARD_COUNT) as pool:
+        per_shard = list(pool.map(lambda i: _search_shard(i, keyword, subject, user_id, since, until), indexes))
+    return list(heapq.merge(*per_shard, key=lambda row: row[4] or "", reverse=True))
+
+# ------------------- Rebalancing -------------------
+def existing_shards():
+    paths = glob.glob(os.path.join(SHARD_DIR, "notes_*.db"))
+    return sorted(int(os.path.basename(p)[6:-3]) for p in paths)
+
+def rebalance(new_count, batch_size=500):
+    """
+    Move rows so that every note sits in shard_for(subject, new_count).
+    Works for growing and shrinking; shard files that end up empty above
+    new_count are removed, and new_count becomes the recorded shard count
+    (CAMPUS_SHARDS is only read before a count has been recorded). Apps
+    already running keep routing by the old count until restarted.
+    Returns the number of rows moved.
+    """
+    moved = 0
+    targets = {i: connect_shard(i) for i in range(new_count)}
+    for index in existing_shards():
+        src = targets.get(index) or connect_shard(index)
+        rows = src.execute("SELECT id, user_id, subject, topic, content, timestamp, file_path FROM notes").fetchall()
+        for start in range(0, len(rows), batch_size):
+            batch = [r for r in rows[start:start + batch_size] if shard_for(r[2], new_count) != index]
+            for r in batch:
+                dst = targets[shard_for(r[2], new_count)]
+                # Ids are global, so a row keeps its id in the new shard.
+                dst.execute("INSERT OR REPLACE INTO notes (id, user_id, subject, topic, content, timestamp, file_path) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)", r)
+            # Commit destinations before deleting from the source so a crash
+            # can only duplicate a row, never lose it.
+            for dst in targets.values():
+                dst.commit()
+            src.executemany("DELETE FROM notes WHERE id=?", [(r[0],) for r in batch])
+            src.commit()
+            moved += len(batch)
+        if index not in targets:
+            src.close()
+            os.remove(shard_path(index))
+    for conn in targets.values():
+        conn.close()
+    set_shard_count(new_count)
+    return moved
+
+def migrate_from_main(main_db="campus_connect.db", count=None):
+    """
+    Copy all notes from the single main database into the shards.
+    """
+    count = count or SHARD_COUNT
+    targets = {i: connect_shard(i) for i in range(count)}
+    src = sqlite3.connect(main_db)
+    rows = src.execute("SELECT id, user_id, subject, topic, content, timestamp, file_path FROM notes").fetchall()
+    for r in rows:
+        targets[shard_for(r[2], count)].execute(
+            "INSERT OR REPLACE INTO notes (id, user_id, subject, topic, content, timestamp, file_path) VALUES (?, ?, ?, ?, ?, ?, ?)", r)
+    for conn in targets.values():
+        conn.commit()
+        conn.close()
+    src.close()
+    set_shard_count(count)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    # python shards.py rebalance 8   |   python shards.py migrate 4
+    if len(sys.argv) == 3 and sys.argv[1] == "rebalance":
+        print(f"Moved {rebalance(int(sys.argv[2]))} rows")
+    elif len(sys.argv) == 3 and sys.argv[1] == "migrate":
+        print(f"Copied {migrate_from_main(count=int(sys.argv[2]))} rows")
+    else:
+        print("usage: python shards.py rebalance N | migrate N")
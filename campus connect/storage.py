@@ -0,0 +1,303 @@
+import os, hmac, shutil, hashlib, datetime, tempfile, threading, http.client
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, quote
+
+# ------------------- Attachment Storage -------------------
+# notes.file_path holds a storage reference. Plain paths ("uploads/...")
+# belong to the local backend; "s3://bucket/key" references belong to the
+# S3-compatible backend. Everything that needs bytes on disk (viewer,
+# open_file, the HTTP server) calls open_local(), which for remote blobs
+# goes through a bounded local read-through cache.
+#
+# Select with CAMPUS_STORAGE=local|s3. The S3 backend is configured with
+# CAMPUS_S3_ENDPOINT, CAMPUS_S3_BUCKET, CAMPUS_S3_ACCESS_KEY,
+# CAMPUS_S3_SECRET_KEY and CAMPUS_S3_REGION, and works against AWS, MinIO or
+# the stand-in server in s3_local.py.
+
+CACHE_DIR = os.environ.get("CAMPUS_BLOB_CACHE", ".blob_cache")
+CACHE_MAX_BYTES = int(os.environ.get("CAMPUS_BLOB_CACHE_MB", "512")) * 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024
+TRANSFER_WORKERS = 8
+
+
+class LocalBackend:
+    scheme = None
+
+    def __init__(self, root="uploads"):
+        self.root = root
+
+    def put(self, local_path, name):
+        os.makedirs(self.root, exist_ok=True)
+        dest = os.path.join(self.root, name)
+        if os.path.abspath(local_path) != os.path.abspath(dest):
+            shutil.copy2(local_path, dest)
+        return dest
+
+    def open_local(self, ref):
+        return ref if ref and os.path.exists(ref) else None
+
+    def delete(self, ref):
+        if os.path.exists(ref):
+            os.remove(ref)
+
+
+class S3Error(Exception):
+    pass
+
+
+class S3Backend:
+    """
+    Minimal S3 client: SigV4 header signing, parallel multipart upload and
+    parallel ranged download, using only the standard library.
+    """
+    scheme = "s3"
+
+    def __init__(self, endpoint, bucket, access_key, secret_key, region="us-east-1",
+                 part_size=PART_SIZE, workers=TRANSFER_WORKERS):
+        url = urlparse(endpoint)
+        self.secure = url.scheme == "https"
+        self.host = url.netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = part_size
+        self.workers = workers
+
+    # ---- signing / requests ----
+    def _sign(self, method, path, query, headers):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        day = now.strftime("%Y%m%d")
+        headers["host"] = self.host
+        headers["x-amz-date"] = amz_date
+        headers["x-amz-content-sha256"] = "UNSIGNED-PAYLOAD"
+        canonical_query = "&".join(f"{quote(k, safe='-_.~')}={quote(str(v), safe='-_.~')}"
+                                   for k, v in sorted(query.items()))
+        signed = sorted(k.lower() for k in headers)
+        lowered = {k.lower(): str(v).strip() for k, v in headers.items()}
+        canonical_headers = "".join(f"{k}:{lowered[k]}\n" for k in signed)
+        canonical = "\n".join([method, quote(path, safe="/-_.~"), canonical_query, canonical_headers,
+                               ";".join(signed), "UNSIGNED-PAYLOAD"])
+        scope = f"{day}/{self.region}/s3/aws4_request"
+        to_sign = "\n".join(["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()])
+        key = ("AWS4" + self.secret_key).encode()
+        for part in (day, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+        headers["Authorization"] = (f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                                    f"SignedHeaders={';'.join(signed)}, Signature={signature}")
+        return canonical_query
+
+    def _request(self, method, key, query=None, body=None, headers=None, expect=(200,)):
+        query = query or {}
+        headers = dict(headers or {})
+        path = f"/{self.bucket}/{key}"
+        qs = self._sign(method, path, query, headers)
+        conn_cls = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+        conn = conn_cls(self.host, timeout=60)
+        try:
+            conn.request(method, quote(path, safe="/-_.~") + ("?" + qs if qs else ""), body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+            if resp.status not in expect:
+                raise S3Error(f"{method} {key}: HTTP {resp.status} {data[:200]!r}")
+            return resp, data
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _find(xml_bytes, tag):
+        for el in ET.fromstring(xml_bytes).iter():
+            if el.tag.rsplit("}", 1)[-1] == tag:
+                return el.text
+        return None
+
+    def _key(self, ref):
+        return ref[len("s3://"):].partition("/")[2]
+
+    # ---- backend interface ----
+    def put(self, local_path, name):
+        key = f"uploads/{name}"
+        size = os.path.getsize(local_path)
+        if size <= self.part_size:
+            with open(local_path, "rb") as f:
+                self._request("PUT", key, body=f.read())
+            return f"s3://{self.bucket}/{key}"
+
+        _, data = self._request("POST", key, query={"uploads": ""})
+        upload_id = self._find(data, "UploadId")
+        parts = [(n + 1, offset) for n, offset in enumerate(range(0, size, self.part_size))]
+
+        def send_part(part):
+            number, offset = part
+            with open(local_path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read(self.part_size)
+            resp, _ = self._request("PUT", key, query={"partNumber": number, "uploadId": upload_id}, body=chunk)
+            return number, resp.getheader("ETag")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                etags = sorted(pool.map(send_part, parts))
+        except Exception:
+            self._request("DELETE", key, query={"uploadId": upload_id}, expect=(200, 204))
+            raise
+        body = "<CompleteMultipartUpload>" + "".join(
+            f"<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>" for n, etag in etags
+        ) + "</CompleteMultipartUpload>"
+        self._request("POST", key, query={"uploadId": upload_id}, body=body.encode())
+        return f"s3://{self.bucket}/{key}"
+
+    def size(self, ref):
+        resp, _ = self._request("HEAD", self._key(ref))
+        return int(resp.getheader("Content-Length"))
+
+    def download(self, ref, dest):
+        """
+        Fetch a blob into dest with parallel ranged GETs.
+        """
+        key = self._key(ref)
+        size = self.size(ref)
+        with open(dest, "wb") as f:
+            f.truncate(size)
+        lock = threading.Lock()
+
+        def fetch(offset):
+            end = min(offset + self.part_size, size) - 1
+            _, data = self._request("GET", key, headers={"Range": f"bytes={offset}-{end}"}, expect=(200, 206))
+            with lock, open(dest, "r+b") as f:
+                f.seek(offset)
+                f.write(data)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(fetch, range(0, size, self.part_size)))
+
+    def open_local(self, ref):
+        return _cache.fetch(ref, self)
+
+    def delete(self, ref):
+        self._request("DELETE", self._key(ref), expect=(200, 204))
+        _cache.evict(ref)
+
+
+class ReadThroughCache:
+    """
+    Local copies of remote blobs, evicted least-recently-used once the
+    directory grows past max_bytes. Concurrent fetches of one ref share a
+    single download; each download goes to its own temporary file.
+    """
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.fetching = {}   # ref -> lock held while it downloads
+
+    def path_for(self, ref):
+        digest = hashlib.sha1(ref.encode()).hexdigest()[:16]
+        return os.path.join(self.root, f"{digest}_{os.path.basename(ref)}")
+
+    def fetch(self, ref, backend):
+        path = self.path_for(ref)
+        with self.lock:
+            ref_lock = self.fetching.setdefault(ref, threading.Lock())
+        with ref_lock:
+            if os.path.exists(path):
+                os.utime(path)   # mark as recently used
+                return path
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+            os.close(fd)
+            try:
+                backend.download(ref, tmp)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            finally:
+                with self.lock:
+                    self.fetching.pop(ref, None)
+        self._trim(keep=path)
+        return path
+
+    def adopt(self, ref, local_path):
+        """
+        Move a freshly uploaded staging file into the cache.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path_for(ref)
+        shutil.move(local_path, path)
+        self._trim(keep=path)
+
+    def evict(self, ref):
+        path = self.path_for(ref)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _trim(self, keep=None):
+        """
+        Evict least-recently-used entries until the cache fits, never
+        removing `keep` (the file a caller is about to use).
+        """
+        with self.lock:
+            entries = []
+            total = 0
+            with os.scandir(self.root) as it:
+                for e in it:
+                    if e.is_file() and not e.name.endswith(".part"):
+                        st = e.stat()
+                        total += st.st_size
+                        if e.path != keep:
+                            entries.append((st.st_atime if st.st_atime > st.st_mtime else st.st_mtime, st.st_size, e.path))
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+
+
+_cache = ReadThroughCache()
+_local = LocalBackend()
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if os.environ.get("CAMPUS_STORAGE", "local") == "s3":
+            _backend = S3Backend(os.environ["CAMPUS_S3_ENDPOINT"], os.environ["CAMPUS_S3_BUCKET"],
+                                 os.environ.get("CAMPUS_S3_ACCESS_KEY", ""), os.environ.get("CAMPUS_S3_SECRET_KEY", ""),
+                                 os.environ.get("CAMPUS_S3_REGION", "us-east-1"))
+        else:
+            _backend = _local
+    return _backend
+
+def backend_for(ref):
+    if ref and ref.startswith("s3://"):
+        backend = get_backend()
+        if backend.scheme != "s3":
+            raise S3Error("S3 reference found but CAMPUS_STORAGE is not s3")
+        return backend
+    return _local
+
+def store(local_path, name):
+    """
+    Hand a staged file in uploads/ to the configured backend. Returns the
+    reference to save in notes.file_path. For remote backends the staging
+    copy becomes the first cache entry.
+    """
+    backend = get_backend()
+    ref = backend.put(local_path, name)
+    if backend is not _local:
+        _cache.adopt(ref, local_path)
+    return ref
+
+def open_local(ref):
+    """
+    Return a local filesystem path for a reference, fetching remote blobs
+    through the cache. None if it cannot be found.
+    """
+    if not ref:
+        return None
+    return backend_for(ref).open_local(ref)
@@ -0,0 +1,167 @@
+import sys, threading
+from auth import KIOSK, conn, c, connect
+from writer import get_writer
+import shards
+
+# ------------------- Subjects -------------------
+# Subjects are interned: `subjects` holds one canonical name per integer id
+# and `subject_aliases` maps every spelling seen (whitespace-collapsed,
+# lowercased) to that id. notes.subject_id carries the key used for
+# filtering and facets; notes.subject keeps the canonical name for display
+# and for the modules that read the text column.
+#
+#   python subjects.py alias DS "Data Structures"   # merge DS into it
+#   python subjects.py list
+
+c.execute('''CREATE TABLE IF NOT EXISTS subjects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE COLLATE NOCASE
+            )''')
+c.execute('''CREATE TABLE IF NOT EXISTS subject_aliases (
+                alias TEXT PRIMARY KEY,
+                subject_id INTEGER
+            )''')
+if "subject_id" not in [row[1] for row in c.execute("PRAGMA table_info(notes)")]:
+    c.execute("ALTER TABLE notes ADD COLUMN subject_id INTEGER")
+c.execute("CREATE INDEX IF NOT EXISTS idx_notes_subject_id_created ON notes (subject_id, created_at)")
+# Writers that only set the text (dbsync, legacy scripts) still get an id
+# when the spelling is known; migrate() picks up the rest on next start.
+c.execute('''CREATE TRIGGER IF NOT EXISTS notes_fill_subject_id AFTER INSERT ON notes
+             WHEN NEW.subject_id IS NULL
+             BEGIN
+                 UPDATE notes SET subject_id = (SELECT subject_id FROM subject_aliases WHERE alias = lower(trim(NEW.subject)))
+                 WHERE id = NEW.id;
+             END''')
+conn.commit()
+
+def alias_key(name):
+    return " ".join((name or "").split()).lower()
+
+def clean_name(name):
+    return " ".join((name or "").split())
+
+
+class SubjectCache:
+    """
+    alias -> id and id -> name, loaded once. Misses insert through the
+    write queue; the private read connection lets request threads resolve
+    subjects too.
+    """
+    def __init__(self):
+        self.by_alias = None
+        self.names = {}
+        self.lock = threading.Lock()
+        self.db = None
+
+    def _ensure_loaded(self):
+        if self.by_alias is not None:
+            return
+        if self.db is None:
+            self.db = connect(timeout=30, check_same_thread=False)
+        self.by_alias = dict(self.db.execute("SELECT alias, subject_id FROM subject_aliases"))
+        self.names = dict(self.db.execute("SELECT id, name FROM subjects"))
+
+    def resolve(self, name, create=True):
+        """
+        Return (subject_id, canonical name), or (None, None) for an unknown
+        subject when create is False.
+        """
+        key = alias_key(name)
+        if not key:
+            return None, None
+        with self.lock:
+            self._ensure_loaded()
+            subject_id = self.by_alias.get(key)
+            if subject_id is None:
+                if not create:
+                    return None, None
+                writer = get_writer()
+                writer.submit("INSERT OR IGNORE INTO subjects (name) VALUES (?)", (clean_name(name),))
+                writer.execute("INSERT OR IGNORE INTO subject_aliases (alias, subject_id) SELECT ?, id FROM subjects WHERE name = ?",
+                               (key, clean_name(name)))
+                subject_id, canonical = self.db.execute(
+                    "SELECT subjects.id, subjects.name FROM subject_aliases JOIN subjects ON subjects.id = subject_aliases.subject_id "
+                    "WHERE alias = ?", (key,)).fetchone()
+                self.by_alias[key] = subject_id
+                self.names[subject_id] = canonical
+            return subject_id, self.names[subject_id]
+
+    def name(self, subject_id):
+        with self.lock:
+            self._ensure_loaded()
+            return self.names.get(subject_id)
+
+    def invalidate(self):
+        with self.lock:
+            self.by_alias = None
+
+cache = SubjectCache()
+
+def resolve(name, create=True):
+    return cache.resolve(name, create)
+
+# ------------------- Migration -------------------
+def migrate():
+    """
+    Give every note without a subject_id one, rewriting its subject text to
+    the canonical name. Returns the number of notes updated.
+    """
+    rows = c.execute("SELECT DISTINCT subject FROM notes WHERE subject_id IS NULL").fetchall()
+    # Resolve first: new subjects are written by the write queue, which
+    # must not wait on this connection's open transaction.
+    resolved = [(text, *resolve(text)) for (text,) in rows]
+    updated = 0
+    for text, subject_id, canonical in resolved:
+        if subject_id is None:
+            continue
+        updated += c.execute("UPDATE notes SET subject_id=?, subject=? WHERE subject_id IS NULL AND subject=?",
+                             (subject_id, canonical, text)).rowcount
+    conn.commit()
+    return updated
+
+if not KIOSK and c.execute("SELECT 1 FROM notes WHERE subject_id IS NULL AND subject IS NOT NULL LIMIT 1").fetchone():
+    migrate()
+
+# ------------------- Aliases and Facets -------------------
+def add_alias(alias, canonical):
+    """
+    Make `alias` another spelling of `canonical`. If the alias was already a
+    subject of its own, its notes are merged into the canonical one,
+    including notes kept in shards.
+    """
+    target_id, target_name = resolve(canonical)
+    row = c.execute("SELECT subject_id FROM subject_aliases WHERE alias=?", (alias_key(alias),)).fetchone()
+    old_id = row[0] if row else None
+    if old_id == target_id:
+        return 0
+    c.execute("INSERT OR REPLACE INTO subject_aliases (alias, subject_id) VALUES (?, ?)", (alias_key(alias), target_id))
+    moved = 0
+    if old_id is not None:
+        old_name = c.execute("SELECT name FROM subjects WHERE id=?", (old_id,)).fetchone()
+        moved = c.execute("UPDATE notes SET subject_id=?, subject=? WHERE subject_id=?", (target_id, target_name, old_id)).rowcount
+        if shards.enabled() and old_name:
+            moved += shards.rename_subject(old_name[0], target_name)
+        c.execute("UPDATE subject_aliases SET subject_id=? WHERE subject_id=?", (target_id, old_id))
+        c.execute("DELETE FROM subjects WHERE id=?", (old_id,))
+    conn.commit()
+    cache.invalidate()
+    return moved
+
+def facets():
+    """
+    [(subject_id, name, note count)], most notes first.
+    """
+    c.execute("""SELECT subjects.id, subjects.name, COUNT(notes.id) FROM subjects
+                 JOIN notes ON notes.subject_id = subjects.id
+                 GROUP BY subjects.id ORDER BY 3 DESC, subjects.name""")
+    return c.fetchall()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "alias":
+        print(f"{add_alias(sys.argv[2], sys.argv[3])} notes moved")
+    elif len(sys.argv) == 2 and sys.argv[1] == "list":
+        for subject_id, name, count in facets():
+            print(f"{subject_id:5}  {count:6}  {name}")
+    else:
+        print('usage: python subjects.py alias ALIAS "Canonical Name" | list')
@@ -0,0 +1,207 @@
+import threading
+from bisect import bisect_left, insort
+from auth import KIOSK, conn, c
+from writer import get_writer
+
+# ------------------- Tags -------------------
+# note_tags is the source of truth; TagIndex keeps an in-memory inverted
+# index (tag -> sorted list of note ids) built lazily on first use and
+# updated by add_tags(), so tag queries are posting-list merges instead of
+# joins.
+
+c.execute('''CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE
+            )''')
+c.execute('''CREATE TABLE IF NOT EXISTS note_tags (
+                note_id INTEGER,
+                tag_id INTEGER,
+                PRIMARY KEY (note_id, tag_id)
+            )''')
+conn.commit()
+
+def normalize(tag):
+    return tag.strip().lower().lstrip("#")
+
+def parse_tags(text):
+    """
+    "midterm, unit-3 solved" -> ["midterm", "unit-3", "solved"]
+    """
+    seen = []
+    for part in (text or "").replace(",", " ").split():
+        tag = normalize(part)
+        if tag and tag not in seen:
+            seen.append(tag)
+    return seen
+
+def _normalize_stored():
+    """
+    Tags used to be stored as typed ("Solved"), so queries, which are
+    normalized, missed them. Rename such tags to their normalized name,
+    merging them into an existing tag of that name.
+    """
+    rows = c.execute("SELECT id, name FROM tags").fetchall()
+    by_name = {name: tag_id for tag_id, name in rows}
+    for tag_id, name in rows:
+        norm = normalize(name or "")
+        if norm == name:
+            continue
+        target = by_name.get(norm)
+        if norm and target is None:
+            c.execute("UPDATE tags SET name=? WHERE id=?", (norm, tag_id))
+            by_name[norm] = tag_id
+            continue
+        if target is not None:
+            c.execute("UPDATE OR IGNORE note_tags SET tag_id=? WHERE tag_id=?", (target, tag_id))
+        c.execute("DELETE FROM note_tags WHERE tag_id=?", (tag_id,))
+        c.execute("DELETE FROM tags WHERE id=?", (tag_id,))
+    conn.commit()
+
+if not KIOSK:
+    _normalize_stored()
+
+def matches(expression, names):
+    """
+    Evaluate a tag expression (same syntax as TagIndex.query) against one
+    note's tag names.
+    """
+    names = set(names)
+    for term in (expression or "").replace(",", " ").split():
+        if term.startswith("-"):
+            if normalize(term[1:]) in names:
+                return False
+        elif not any(normalize(alt) in names for alt in term.split("|")):
+            return False
+    return True
+
+# ------------------- Posting List Operations -------------------
+def intersect(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    out, j = [], 0
+    for x in a:
+        # Skip ahead in the longer list with a binary search.
+        j = bisect_left(b, x, j)
+        if j == len(b):
+            break
+        if b[j] == x:
+            out.append(x)
+    return out
+
+def union(a, b):
+    out, i, j = [], 0, 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            out.append(a[i]); i += 1
+        elif b[j] < a[i]:
+            out.append(b[j]); j += 1
+        else:
+            out.append(a[i]); i += 1; j += 1
+    out.extend(a[i:])
+    out.extend(b[j:])
+    return out
+
+def difference(a, b):
+    out, j = [], 0
+    for x in a:
+        j = bisect_left(b, x, j)
+        if j == len(b) or b[j] != x:
+            out.append(x)
+    return out
+
+
+class TagIndex:
+    def __init__(self):
+        self.postings = None
+        self.lock = threading.Lock()
+
+    def _ensure_built(self):
+        if self.postings is not None:
+            return
+        postings = {}
+        for name, note_id in c.execute("""
+                SELECT tags.name, note_tags.note_id FROM note_tags
+                JOIN tags ON tags.id = note_tags.tag_id ORDER BY note_tags.note_id"""):
+            postings.setdefault(name, []).append(note_id)
+        self.postings = postings
+
+    def invalidate(self):
+        with self.lock:
+            self.postings = None
+
+    def add(self, note_id, tag_names):
+        with self.lock:
+            if self.postings is None:
+                return   # built from the table on first query anyway
+            for name in tag_names:
+                ids = self.postings.setdefault(name, [])
+                i = bisect_left(ids, note_id)
+                if i == len(ids) or ids[i] != note_id:
+                    insort(ids, note_id)
+
+    def query(self, expression):
+        """
+        Evaluate a tag expression. Space-separated terms are ANDed, "a|b" is
+        an OR group and a leading "-" negates a term:
+        "midterm unit-3|unit-4 -solved".
+        Returns (included, excluded) sorted id lists; included is None when
+        the expression has only NOT terms (i.e. any note not excluded).
+        """
+        with self.lock:
+            self._ensure_built()
+            result = None
+            excluded = []
+            for term in (expression or "").replace(",", " ").split():
+                if term.startswith("-"):
+                    excluded = union(excluded, self.postings.get(normalize(term[1:]), []))
+                    continue
+                group = []
+                for alt in term.split("|"):
+                    group = union(group, self.postings.get(normalize(alt), []))
+                result = group if result is None else intersect(result, group)
+            if result is not None and excluded:
+                return difference(result, excluded), []
+            return result, excluded
+
+    def tag_names(self):
+        with self.lock:
+            self._ensure_built()
+            return sorted(self.postings)
+
+
+index = TagIndex()
+
+def add_tags(note_id, tag_names):
+    """
+    Attach tags to a note through the write queue and update the index.
+    Names are normalized like queries are, and duplicates dropped.
+    """
+    names = []
+    for name in tag_names:
+        name = normalize(name or "")
+        if name and name not in names:
+            names.append(name)
+    tag_names = names
+    writer = get_writer()
+    futures = []
+    for name in tag_names:
+        writer.submit("INSERT OR IGNORE INTO tags (name) VALUES (?)", (name,))
+        futures.append(writer.submit("INSERT OR IGNORE INTO note_tags (note_id, tag_id) SELECT ?, id FROM tags WHERE name=?",
+                                     (note_id, name)))
+    for f in futures:
+        f.result()
+    index.add(note_id, tag_names)
+
+def tags_for(note_ids):
+    """
+    Map note id -> list of tag names, for display.
+    """
+    if not note_ids:
+        return {}
+    marks = ",".join("?" * len(note_ids))
+    out = {}
+    for note_id, name in c.execute(f"""
+            SELECT note_tags.note_id, tags.name FROM note_tags JOIN tags ON tags.id = note_tags.tag_id
+            WHERE note_tags.note_id IN ({marks}) ORDER BY tags.name""", list(note_ids)):
+        out.setdefault(note_id, []).append(name)
+    return out
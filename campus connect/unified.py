@@ -0,0 +1,114 @@
+import re, heapq, itertools
+from concurrent.futures import ThreadPoolExecutor
+from auth import conn, c, connect
+
+# ------------------- Unified Search -------------------
+# One search box over notes, doubts and answers. Each kind has its own FTS5
+# index kept in sync by triggers. A search runs the three index queries
+# concurrently on separate connections, then merges the ranked streams with
+# heapq.merge. bm25 scores from different indexes are not comparable (each
+# has its own term statistics), so streams are merged by reciprocal rank,
+# 1 / (RRF_K + position), with bm25 breaking ties. Every stream is read in
+# batches, so a search only reads as far as the page asked for.
+
+RRF_K = 60
+
+_INDEXES = [
+    # (fts table, source table, indexed columns)
+    ("notes_fts", "notes", ("subject", "topic", "content")),
+    ("doubts_fts", "doubts", ("subject", "question")),
+    ("answers_fts", "answers", ("answer",)),
+]
+
+for _fts, _table, _cols in _INDEXES:
+    _exists = c.execute("SELECT 1 FROM sqlite_master WHERE name=?", (_fts,)).fetchone()
+    _names = ", ".join(_cols)
+    _new = ", ".join("new." + col for col in _cols)
+    _old = ", ".join("old." + col for col in _cols)
+    c.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {_fts} USING fts5({_names}, content='{_table}', content_rowid='id', "
+              f"prefix='2 3')")
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS {_fts}_ai AFTER INSERT ON {_table} BEGIN
+                      INSERT INTO {_fts} (rowid, {_names}) VALUES (new.id, {_new});
+                  END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS {_fts}_ad AFTER DELETE ON {_table} BEGIN
+                      INSERT INTO {_fts} ({_fts}, rowid, {_names}) VALUES ('delete', old.id, {_old});
+                  END''')
+    # Only the indexed columns: bookkeeping updates (created_at, subject_id)
+    # must not re-index the row.
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS {_fts}_au AFTER UPDATE OF {_names} ON {_table} BEGIN
+                      INSERT INTO {_fts} ({_fts}, rowid, {_names}) VALUES ('delete', old.id, {_old});
+                      INSERT INTO {_fts} (rowid, {_names}) VALUES (new.id, {_new});
+                  END''')
+    if not _exists:
+        c.execute(f"INSERT INTO {_fts} ({_fts}) VALUES ('rebuild')")
+conn.commit()
+
+_SOURCES = {
+    "note": """
+        SELECT notes.id, -bm25(notes_fts, 2.0, 3.0, 1.0) AS score, notes.subject || ' - ' || notes.topic,
+               snippet(notes_fts, 2, '', '', '...', 16), notes.timestamp, notes.file_path
+        FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid
+        WHERE notes_fts MATCH ? ORDER BY score DESC, notes.timestamp DESC LIMIT ? OFFSET ?
+    """,
+    "doubt": """
+        SELECT doubts.id, -bm25(doubts_fts, 2.0, 1.0) AS score, doubts.subject || ' - asked by ' || COALESCE(users.username, '?'),
+               snippet(doubts_fts, 1, '', '', '...', 16), doubts.timestamp, doubts.id
+        FROM doubts_fts JOIN doubts ON doubts.id = doubts_fts.rowid LEFT JOIN users ON users.id = doubts.user_id
+        WHERE doubts_fts MATCH ? ORDER BY score DESC, doubts.timestamp DESC LIMIT ? OFFSET ?
+    """,
+    "answer": """
+        SELECT answers.id, -bm25(answers_fts) AS score, 'Re: ' || COALESCE(doubts.subject, '') || ' - ' || COALESCE(users.username, '?'),
+               snippet(answers_fts, 0, '', '', '...', 16), answers.timestamp, answers.doubt_id
+        FROM answers_fts JOIN answers ON answers.id = answers_fts.rowid
+        JOIN doubts ON doubts.id = answers.doubt_id LEFT JOIN users ON users.id = answers.user_id
+        WHERE answers_fts MATCH ? ORDER BY score DESC, answers.timestamp DESC LIMIT ? OFFSET ?
+    """,
+}
+
+def match_expression(text):
+    """
+    "linked list" -> '"linked"* "list"*': every word, as a prefix.
+    """
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text or ""))
+
+def _item(kind, row, position):
+    item_id, score, title, snippet, ts, ref = row
+    return {"type": kind, "id": item_id, "score": score, "rank": 1.0 / (RRF_K + position), "title": title,
+            "snippet": snippet, "timestamp": ts,
+            "file_path": ref if kind == "note" else None, "doubt_id": ref if kind != "note" else None}
+
+def _stream(db, kind, match, page_size, first):
+    rows, offset = first, 0
+    while True:
+        for i, row in enumerate(rows):
+            yield _item(kind, row, offset + i)
+        if len(rows) < page_size:
+            return
+        offset += page_size
+        rows = db.execute(_SOURCES[kind], (match, page_size, offset)).fetchall()
+
+def unified_search(text, page=0, page_size=20, kinds=("note", "doubt", "answer")):
+    """
+    Return (items, has_more) for one page of the merged ranking. Each item
+    is a dict with type ("note", "doubt" or "answer"), id, score (bm25),
+    rank, title, snippet, timestamp, file_path (notes) and doubt_id
+    (doubts/answers).
+    """
+    match = match_expression(text)
+    if not match:
+        return [], False
+    wanted = page_size * (page + 1) + 1
+    # Each stream can contribute at most `wanted` rows to this page.
+    batch = min(wanted, 200)
+    conns = {kind: connect(timeout=30, check_same_thread=False) for kind in kinds}
+    try:
+        with ThreadPoolExecutor(max_workers=len(kinds)) as pool:
+            firsts = {kind: pool.submit(lambda k: conns[k].execute(_SOURCES[k], (match, batch, 0)).fetchall(), kind)
+                      for kind in kinds}
+            streams = [_stream(conns[kind], kind, match, batch, firsts[kind].result()) for kind in kinds]
+        merged = heapq.merge(*streams, key=lambda item: (item["rank"], item["score"], item["timestamp"] or ""), reverse=True)
+        items = list(itertools.islice(merged, page * page_size, wanted))
+    finally:
+        for db in conns.values():
+            db.close()
+    return items[:page_size], len(items) > page_size
@@ -1,30 +1,204 @@
-import shutil, os, datetime
+import shutil, os, hashlib, datetime, threading
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import messagebox
-from auth import conn, c
+import shards
+from writer import get_writer
+from maintenance import file_sha256
+import compress
+import ratelimit
+import quota
+import tags
+import storage
+import autocomplete
+import subjects
+import attachments
+
+COPY_WORKERS = 4
+COPY_CHUNK = 1024 * 1024
+
+def reserve_dest(base, stamp):
+    """
+    Claim uploads/<stamp>_<base>, or <stamp>_<root>_<n><ext> if taken, by
+    creating it empty and exclusively, so two uploads of the same name in
+    the same second never get the same path. Returns the path.
+    """
+    os.makedirs("uploads", exist_ok=True)
+    root, ext = os.path.splitext(base)
+    dest, n = os.path.join("uploads", f"{stamp}_{base}"), 1
+    while True:
+        try:
+            open(dest, "xb").close()
+            return dest
+        except FileExistsError:
+            dest = os.path.join("uploads", f"{stamp}_{root}_{n}{ext}")
+            n += 1
+
+def list_folder(folder):
+    """
+    Files under a folder (recursively, hidden files skipped), sorted by path.
+    """
+    found = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        found.extend(os.path.join(root, f) for f in sorted(files) if not f.startswith("."))
+    return found
+
+def stage_files(paths, progress=None, workers=COPY_WORKERS):
+    """
+    Copy files into uploads/ in parallel, hashing each while it is copied.
+    progress(done_bytes, total_bytes) is called from the worker threads.
+    Returns [(staged_path, sha256)] in input order; on failure every copy
+    made so far is removed and the error is raised.
+    """
+    total = sum(os.path.getsize(p) for p in paths)
+    stamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+    lock = threading.Lock()
+    done = [0]
+    dests = []
+    for p in paths:
+        dests.append(reserve_dest(os.path.basename(p), stamp))
+
+    def copy(pair):
+        src, dest = pair
+        h = hashlib.sha256()
+        with open(src, "rb") as fin, open(dest, "wb") as fout:
+            for block in iter(lambda: fin.read(COPY_CHUNK), b""):
+                h.update(block)
+                fout.write(block)
+                with lock:
+                    done[0] += len(block)
+                    if progress:
+                        progress(done[0], total)
+        shutil.copystat(src, dest)
+        return dest, h.hexdigest()
 
-# Copy selected file to uploads folder
-def copy_to_uploads(src_path: str) -> str:
-    if not src_path:
-        return None
     try:
-        base = os.path.basename(src_path)
-        timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        dest_name = f"{timestamp}_{base}"
-        dest_path = os.path.join("uploads", dest_name)
-        shutil.copy2(src_path, dest_path)
-        return dest_path
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(copy, zip(paths, dests)))
+    except Exception:
+        for dest in dests:
+            if os.path.exists(dest):
+                os.remove(dest)
+        raise
+
+def check_upload(user_id, paths=()):
+    """
+    Login, rate limit and quota checks. Returns an error message or None.
+    """
+    if not user_id:
+        return "User not logged in"
+    if not ratelimit.allow("upload", user_id):
+        return "Too many uploads. Please wait a moment and try again."
+    paths = [p for p in paths if p and os.path.exists(p)]
+    if len(paths) > 1 and shards.enabled():
+        return "Multiple attachments are not supported while notes are sharded."
+    if paths:
+        return quota.check_quota(user_id, sum(os.path.getsize(p) for p in paths), files=len(paths))
+    return None
+
+def save_upload(user_id, subject, topic, content, staged=(), tag_names=None, savings=None):
+    """
+    Create the note for files already staged by stage_files. No dialogs, so
+    it can run on a worker thread; on failure the staged copies are removed
+    and the error is raised. Returns the note id.
+    """
+    try:
+        return create_note(user_id, subject, topic, content, tag_names=tag_names, files=staged, savings=savings)
+    except Exception:
+        for path, _ in staged:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+def finish_upload(user_id, subject, topic, content, staged=(), tag_names=None):
+    """
+    save_upload with dialogs.
+    """
+    savings = []
+    try:
+        save_upload(user_id, subject, topic, content, staged, tag_names, savings)
+    except Exception as e:
+        messagebox.showerror("Error", f"Upload failed: {e}")
+        return False
+    messagebox.showinfo("Success", success_message(savings))
+    return True
+
+def success_message(savings):
+    """
+    The upload confirmation, with what recompression saved per file.
+    """
+    saved = [(name, before, after) for name, before, after in savings if after < before]
+    if not saved:
+        return "Note uploaded successfully!"
+    lines = [f"{name}: {before / 1024:.0f} KB -> {after / 1024:.0f} KB" for name, before, after in saved]
+    total = sum(before - after for _, before, after in saved)
+    return "Note uploaded successfully!\n\nRecompressed to save %.1f MB:\n%s" % (total / (1024 * 1024), "\n".join(lines))
+
+# Upload note with optional file(s)
+def upload_note(user_id, subject, topic, content, selected_file=None, tag_names=None):
+    paths = [selected_file] if isinstance(selected_file, str) else list(selected_file or [])
+    error = check_upload(user_id, paths)
+    if error:
+        messagebox.showerror("Error", error)
+        return False
+    try:
+        staged = stage_files([p for p in paths if p])
     except Exception as e:
         messagebox.showerror("Error", f"File copy failed: {e}")
-        return None
+        return False
+    return finish_upload(user_id, subject, topic, content, staged, tag_names)
 
-# Upload note with optional file
-def upload_note(user_id, subject, topic, content, selected_file=None):
-    if not user_id:
-        messagebox.showerror("Error", "User not logged in")
-        return
-    file_path = copy_to_uploads(selected_file)
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute("INSERT INTO notes (user_id, subject, topic, content, timestamp, file_path) VALUES (?, ?, ?, ?, ?, ?)",
-              (user_id, subject, topic, content, timestamp, file_path))
-    conn.commit()
-    messagebox.showinfo("Success", "Note uploaded successfully!")
+def create_note(user_id, subject, topic, content, file_path=None, tag_names=None, digest=None, files=None, savings=None):
+    """
+    Store attachments already staged in uploads/ and insert the note. Pass
+    one file as file_path (and optionally its digest) or several as files,
+    a list of (staged_path, sha256 or None). The note, its attachments,
+    their checksums and the quota update commit in one transaction (in
+    shard mode the note row itself goes to its shard just before).
+    Shared by upload_note and resumable uploads; no dialogs, raises on
+    storage errors. Returns the note id. If savings is a list, it receives
+    (file name, bytes before, bytes after recompression) for every file.
+    """
+    subject_id, subject = subjects.resolve(subject)
+    files = list(files or ([(file_path, digest)] if file_path else []))
+    if files and compress.enabled():
+        results = compress.compress_many([path for path, _ in files])
+        if savings is not None:
+            savings.extend((os.path.basename(old), before, after) for (old, _), (_, before, after) in zip(files, results))
+        files = [(new, d if new == old else None) for (new, _, _), (old, d) in zip(results, files)]
+    now = datetime.datetime.now()
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+
+    def store(item):
+        path, sha = item
+        size, sha = os.path.getsize(path), sha or file_sha256(path)
+        return storage.store(path, os.path.basename(path)), size, sha
+
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+        stored = list(pool.map(store, files))
+
+    if shards.enabled():
+        # The row lives in its shard, but its id is global, so attachments,
+        # checksums and usage are recorded here like any other note's.
+        note_id = shards.insert_note(user_id, subject, topic, content, timestamp, stored[0][0] if stored else None)
+        statements = []
+        owner = lambda rowids: note_id
+    else:
+        statements = [("INSERT INTO notes (user_id, subject, subject_id, topic, content, timestamp, file_path, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       (user_id, subject, subject_id, topic, content, timestamp, stored[0][0] if stored else None, int(now.timestamp())))]
+        owner = lambda rowids: rowids[0]   # the notes row inserted first in this group
+    for position, (ref, size, sha) in enumerate(stored):
+        statements.append((attachments.INSERT_SQL, lambda rowids, p=position, r=ref, n=size, h=sha: (owner(rowids), p, r, n, h)))
+        # Baseline for the background checksum scrub in maintenance.py.
+        statements.append(("INSERT OR REPLACE INTO file_checksums (file_path, sha256, size, verified_at, status) VALUES (?, ?, ?, ?, 'ok')",
+                           (ref, sha, size, timestamp)))
+    if stored:
+        statements.append((quota.ADD_USAGE_SQL, (user_id, sum(size for _, size, _ in stored), len(stored))))
+    # Batched with other pending writes; result() returns once everything is committed.
+    rowids = get_writer().submit_group(statements).result() if statements else []
+    if not shards.enabled():
+        note_id = rowids[0]
+    if tag_names:
+        tags.add_tags(note_id, tag_names)
+    autocomplete.index.add(subject, topic, *(tag_names or []))
+    return note_id
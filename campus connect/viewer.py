@@ -0,0 +1,174 @@
+import io, os, threading
+from collections import OrderedDict
+import tkinter as tk
+import customtkinter as ctk
+
+# ------------------- Attachment Viewer -------------------
+# Built-in viewer for PDFs and images. Pages are rendered on demand (PyMuPDF
+# for PDFs, Pillow for images other than PNG/GIF), kept as PNG bytes in a
+# bounded LRU cache, and the next page is rendered in the background.
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+CACHE_PAGES = 16
+RENDER_ZOOM = 1.5
+NATIVE_IMAGES = (".png", ".gif")
+PIL_IMAGES = (".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+
+def can_view(path):
+    ext = os.path.splitext(path or "")[1].lower()
+    if ext == ".pdf":
+        return fitz is not None
+    return ext in NATIVE_IMAGES or (ext in PIL_IMAGES and Image is not None)
+
+
+class PageCache:
+    """
+    Thread-safe LRU of rendered pages (PNG bytes) keyed by page number.
+    """
+    def __init__(self, capacity=CACHE_PAGES):
+        self.capacity = capacity
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, page):
+        with self.lock:
+            data = self.pages.get(page)
+            if data is None:
+                self.misses += 1
+                return None
+            self.pages.move_to_end(page)
+            self.hits += 1
+            return data
+
+    def put(self, page, data):
+        with self.lock:
+            self.pages[page] = data
+            self.pages.move_to_end(page)
+            while len(self.pages) > self.capacity:
+                self.pages.popitem(last=False)
+
+    def __contains__(self, page):
+        with self.lock:
+            return page in self.pages
+
+
+class DocumentRenderer:
+    """
+    Renders single pages of a PDF or image to PNG bytes. PyMuPDF documents
+    are not safe to share across threads, so rendering is serialized.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.is_pdf = path.lower().endswith(".pdf")
+        if self.is_pdf:
+            self.doc = fitz.open(path)
+            self.page_count = self.doc.page_count
+        else:
+            self.doc = None
+            self.page_count = 1
+
+    def render(self, page):
+        with self.lock:
+            if self.is_pdf:
+                if self.doc is None:
+                    return None   # viewer closed while a prefetch was queued
+                pix = self.doc.load_page(page).get_pixmap(matrix=fitz.Matrix(RENDER_ZOOM, RENDER_ZOOM))
+                return pix.tobytes("png")
+            if self.path.lower().endswith(NATIVE_IMAGES):
+                with open(self.path, "rb") as f:
+                    return f.read()
+            with Image.open(self.path) as img:
+                img.thumbnail((1600, 1600))
+                buf = io.BytesIO()
+                img.save(buf, "PNG")
+                return buf.getvalue()
+
+    def close(self):
+        with self.lock:
+            if self.doc is not None:
+                self.doc.close()
+                self.doc = None
+
+
+class AttachmentViewer(ctk.CTkToplevel):
+    def __init__(self, master, path):
+        super().__init__(master)
+        self.title(os.path.basename(path))
+        self.geometry("800x900")
+        self.renderer = DocumentRenderer(path)
+        self.cache = PageCache()
+        self.page = 0
+        self.photo = None
+        self.prefetching = set()
+
+        nav = ctk.CTkFrame(self)
+        nav.pack(fill="x", padx=5, pady=5)
+        ctk.CTkButton(nav, text="< Prev", width=80, command=self.prev_page).pack(side="left", padx=5)
+        self.page_label = ctk.CTkLabel(nav, text="")
+        self.page_label.pack(side="left", expand=True)
+        ctk.CTkButton(nav, text="Next >", width=80, command=self.next_page).pack(side="right", padx=5)
+
+        self.canvas = tk.Canvas(self, background="#444444", highlightthickness=0)
+        yscroll = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=yscroll.set)
+        yscroll.pack(side="right", fill="y")
+        self.canvas.pack(fill="both", expand=True)
+
+        self.bind("<Left>", lambda e: self.prev_page())
+        self.bind("<Right>", lambda e: self.next_page())
+        self.bind("<Prior>", lambda e: self.prev_page())
+        self.bind("<Next>", lambda e: self.next_page())
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.show_page(0)
+
+    def show_page(self, page):
+        self.page = page
+        self.page_label.configure(text=f"Page {page + 1} of {self.renderer.page_count}")
+        data = self.cache.get(page)
+        if data is None:
+            data = self.renderer.render(page)
+            self.cache.put(page, data)
+        self.photo = tk.PhotoImage(data=data)
+        self.canvas.delete("all")
+        self.canvas.create_image(0, 0, anchor="nw", image=self.photo)
+        self.canvas.configure(scrollregion=(0, 0, self.photo.width(), self.photo.height()))
+        self.canvas.yview_moveto(0)
+        self.prefetch(page + 1)
+
+    def prefetch(self, page):
+        if page >= self.renderer.page_count or page in self.cache or page in self.prefetching:
+            return
+        self.prefetching.add(page)
+
+        def work():
+            try:
+                data = self.renderer.render(page)
+                if data:
+                    self.cache.put(page, data)
+            finally:
+                self.prefetching.discard(page)
+        threading.Thread(target=work, daemon=True).start()
+
+    def next_page(self):
+        if self.page + 1 < self.renderer.page_count:
+            self.show_page(self.page + 1)
+
+    def prev_page(self):
+        if self.page > 0:
+            self.show_page(self.page - 1)
+
+    def close(self):
+        self.renderer.close()
+        self.destroy()
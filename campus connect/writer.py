@@ -0,0 +1,185 @@
+import sqlite3, threading, queue, time
+from concurrent.futures import Future, InvalidStateError
+from auth import DB_PATH, KIOSK
+import changes  # creates the change-feed triggers before the first write
+
+# ------------------- Group-commit Write Queue -------------------
+# A single background thread owns the write connection. Callers enqueue an
+# INSERT and get a Future; the thread drains the queue into one transaction
+# and resolves every Future (with the new row id) only after COMMIT returns,
+# so one fsync is shared by the whole batch.
+
+class WriteQueue:
+    def __init__(self, db_path=DB_PATH, max_batch=64, max_delay=0.005):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.commits = 0
+        self.rows = 0
+        self.errors = 0
+        self.largest_batch = 0
+        self.batch_sizes = {}
+        self.inflight = []
+        self.stopped = None
+        self.thread = threading.Thread(target=self._run, name="campus-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, sql, params=()):
+        """
+        Queue one write. Returns a Future resolved with lastrowid once the
+        transaction containing it has been committed.
+        """
+        fut = Future()
+        self.pending.put((sql, params, fut))
+        self._check_alive()
+        return fut
+
+    def submit_group(self, statements):
+        """
+        Queue several (sql, params) writes that must commit or fail together.
+        They run inside a savepoint within the batch; the Future resolves
+        with the list of lastrowids, or with the first error if any failed.
+        params may be a callable taking the lastrowids of the statements
+        before it, to refer to a row inserted earlier in the group.
+        """
+        fut = Future()
+        self.pending.put((list(statements), None, fut))
+        self._check_alive()
+        return fut
+
+    def execute(self, sql, params=()):
+        """
+        Blocking convenience wrapper around submit().
+        """
+        return self.submit(sql, params).result()
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            self._loop()
+        except BaseException as e:
+            self.stopped = e
+            raise
+        finally:
+            if self.stopped is None:
+                self.stopped = RuntimeError("write queue stopped")
+            self._fail_pending()
+
+    def _loop(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        while True:
+            batch = self.inflight = self._collect()
+            results = []
+            try:
+                conn.execute("BEGIN")
+                for sql, params, fut in batch:
+                    try:
+                        if isinstance(sql, list):
+                            results.append((fut, self._run_group(conn, sql), None))
+                        else:
+                            results.append((fut, conn.execute(sql, params).lastrowid, None))
+                    except Exception as e:
+                        # A bad row (SQL error, unbindable params) fails on its
+                        # own; the rest of the batch still commits.
+                        results.append((fut, None, e))
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                results = [(fut, None, e) for _, _, fut in batch]
+            self._record(len(batch), sum(1 for r in results if r[2] is not None))
+            for fut, rowid, err in results:
+                if err is None:
+                    fut.set_result(rowid)
+                else:
+                    fut.set_exception(err)
+            self.inflight = []
+
+    def _check_alive(self):
+        if self.stopped is not None:
+            self._fail_pending()
+
+    def _fail_pending(self):
+        """
+        The writer thread has exited: fail every queued or in-flight Future
+        so no caller blocks on result() forever.
+        """
+        error = RuntimeError(f"write queue stopped: {self.stopped!r}")
+        futures = [fut for _, _, fut in self.inflight]
+        while True:
+            try:
+                futures.append(self.pending.get_nowait()[2])
+            except queue.Empty:
+                break
+        for fut in futures:
+            try:
+                fut.set_exception(error)
+            except InvalidStateError:
+                pass   # already resolved
+
+    @staticmethod
+    def _run_group(conn, statements):
+        conn.execute("SAVEPOINT write_group")
+        try:
+            rowids = []
+            for sql, params in statements:
+                rowids.append(conn.execute(sql, params(rowids) if callable(params) else params).lastrowid)
+        except Exception:
+            conn.execute("ROLLBACK TO write_group")
+            conn.execute("RELEASE write_group")
+            raise
+        conn.execute("RELEASE write_group")
+        return rowids
+
+    def _record(self, size, failed):
+        with self.lock:
+            self.commits += 1
+            self.rows += size - failed
+            self.errors += failed
+            self.largest_batch = max(self.largest_batch, size)
+            self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+
+    def stats(self):
+        """
+        Throughput and commit-batch-size metrics since the queue started.
+        """
+        with self.lock:
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            return {
+                "commits": self.commits,
+                "rows": self.rows,
+                "errors": self.errors,
+                "queued": self.pending.qsize(),
+                "rows_per_sec": self.rows / elapsed,
+                "avg_batch_size": (self.rows + self.errors) / self.commits if self.commits else 0.0,
+                "largest_batch": self.largest_batch,
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            }
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    global _writer
+    if KIOSK:
+        raise RuntimeError("Campus Connect is running in read-only kiosk mode")
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteQueue()
+        return _writer